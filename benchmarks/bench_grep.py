@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from core import utils
+from plugins.search import compile_pattern, parallel_search, serial_search
+
+
+def make_tree(root, dirs=50, files_per_dir=100, lines_per_file=200):
+    line = "lorem ipsum dolor sit amet consectetur adipiscing elit\n"
+    for d in range(dirs):
+        dir_path = os.path.join(root, f"dir_{d:03}")
+        os.makedirs(dir_path, exist_ok=True)
+        for n in range(files_per_dir):
+            with open(os.path.join(dir_path, f"file_{n:04}.txt"), 'w') as f:
+                for i in range(lines_per_file):
+                    if i % 97 == 0:
+                        f.write(f"needle {d} {n} {i}\n")
+                    else:
+                        f.write(line)
+
+
+def tree_size(root):
+    return sum(os.path.getsize(path) for path in utils.walk_files(root))
+
+
+def run(name, results, total_bytes):
+    start = time.perf_counter()
+    count = sum(len(matches) for _, matches in results)
+    elapsed = time.perf_counter() - start
+    print(f"{name:20} {elapsed:8.3f} s {total_bytes / elapsed / 1e6:8.1f} MB/s {count} matches")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    matcher = compile_pattern(r"needle \d+")
+    root = tempfile.mkdtemp(prefix="bench_grep_")
+
+    try:
+        make_tree(root)
+        total_bytes = tree_size(root)
+
+        run("serial", serial_search(utils.walk_files(root), matcher), total_bytes)
+        run(f"threads -j {workers}", parallel_search(utils.walk_files(root), matcher, workers, True), total_bytes)
+        run(f"processes -j {workers}", parallel_search(utils.walk_files(root), matcher, workers), total_bytes)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
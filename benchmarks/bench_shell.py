@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import datetime
+import statistics
+import subprocess
+import contextlib
+from benchmarks import trees
+
+DEFAULT_WORKDIR = os.path.join(os.path.expanduser("~"), ".cache", "minishell-bench")
+PARALLEL_JOBS = 4
+HISTORY_COMMANDS = 2000
+
+CASES = [
+    {'name': "ls_tiny", 'tree': "tiny", 'command': "ls -1 {tree}/d0000", 'items': "dir"},
+    {'name': "cat_huge", 'tree': "huge", 'command': "cat {tree}/text_0.txt", 'bytes': "file"},
+    {'name': "cp_huge", 'tree': "huge", 'command': "cp -r {tree} {scratch}/copy", 'cleanup': ["copy"]},
+    {'name': "cp_tiny", 'tree': "tiny", 'command': "cp -r {tree} {scratch}/copy", 'cleanup': ["copy"]},
+    {'name': "cp_deep", 'tree': "deep", 'command': "cp -r {tree} {scratch}/copy", 'cleanup': ["copy"]},
+    {'name': "grep_huge", 'tree': "huge", 'command': "grep -r --no-index needle {tree}"},
+    {'name': "grep_tiny", 'tree': "tiny", 'command': "grep -r --no-index needle {tree}"},
+    {'name': "grep_mixed", 'tree': "mixed", 'command': "grep -r --no-index needle {tree}"},
+    {'name': "grep_mixed_j", 'tree': "mixed", 'command': f"grep -r --no-index -j {PARALLEL_JOBS} needle {{tree}}"},
+    {'name': "zip_mixed", 'tree': "mixed", 'command': "zip {tree} {scratch}/out.zip", 'cleanup': ["out.zip"]},
+    {'name': "zip_mixed_j", 'tree': "mixed", 'command': f"zip {{tree}} {{scratch}}/out.zip -j {PARALLEL_JOBS}",
+     'cleanup': ["out.zip"]},
+    {'name': "tar_mixed", 'tree': "mixed", 'command': "tar {tree} {scratch}/out.tar.gz", 'cleanup': ["out.tar.gz"]},
+    {'name': "tar_mixed_j", 'tree': "mixed", 'command': f"tar {{tree}} {{scratch}}/out.tar.gz -j {PARALLEL_JOBS}",
+     'cleanup': ["out.tar.gz"]},
+    {'name': "unzip_mixed", 'tree': "mixed", 'prepare': "zip {tree} {scratch}/in.zip",
+     'command': "unzip {scratch}/in.zip", 'cleanup': ["mixed"]},
+    {'name': "untar_mixed", 'tree': "mixed", 'prepare': "tar {tree} {scratch}/in.tar.gz",
+     'command': "untar {scratch}/in.tar.gz", 'cleanup': ["mixed"]},
+    {'name': "history_add", 'tree': None, 'command': "cd .", 'times': HISTORY_COMMANDS},
+    {'name': "history_search", 'tree': None, 'command': "history search cd", 'times': 100},
+]
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kb():
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_revision():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def case_volume(case, tree):
+    if tree is None:
+        return None, case.get('times', 1)
+    if case.get('bytes') == "file":
+        path = case['command'].split()[-1].format(tree=tree['path'])
+        return os.path.getsize(path), 1
+    if case.get('items') == "dir":
+        path = case['command'].split()[-1].format(tree=tree['path'])
+        return None, len(os.listdir(path))
+    return tree['bytes'], tree['files']
+
+
+def run_case(shell, case, tree, scratch, repeat, warmup):
+    fields = {'tree': tree['path'] if tree else "", 'scratch': scratch}
+    command = case['command'].format(**fields)
+    times = case.get('times', 1)
+
+    shell.execute_line(f"cd {scratch}")
+    if case.get('prepare'):
+        shell.execute_line(case['prepare'].format(**fields))
+
+    latencies = []
+    peaks = []
+    for run in range(warmup + repeat):
+        for name in case.get('cleanup', ()):
+            remove(os.path.join(scratch, name))
+        reset_peak_rss()
+        started = time.perf_counter()
+        for _ in range(times):
+            shell.execute_line(command)
+        elapsed = time.perf_counter() - started
+        if run >= warmup:
+            latencies.append(elapsed)
+            peaks.append(peak_rss_kb())
+
+    for name in case.get('cleanup', ()):
+        remove(os.path.join(scratch, name))
+
+    total_bytes, items = case_volume(case, tree)
+    median = statistics.median(latencies)
+    result = {
+        'name': case['name'],
+        'command': case['command'],
+        'tree': tree['id'] if tree else None,
+        'repeat': repeat,
+        'latency_s': {
+            'min': min(latencies),
+            'median': median,
+            'mean': statistics.fmean(latencies),
+            'max': max(latencies),
+        },
+        'per_command_s': median / times,
+        'items_per_s': items / median if items else None,
+        'throughput_mb_s': total_bytes / median / 1e6 if total_bytes else None,
+        'peak_rss_kb': max(peaks),
+    }
+    return result
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+
+    lines = [f"{'benchmark':16} {'baseline ms':>12} {'current ms':>12} {'change':>8}"]
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None:
+            continue
+        before = old['latency_s']['median'] * 1000
+        after = result['latency_s']['median'] * 1000
+        lines.append(f"{result['name']:16} {before:12.2f} {after:12.2f} {(after / before - 1) * 100:+7.1f}%")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MiniShell command benchmarks")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="tree size multiplier (tiny tree: 50000 files per 1.0)")
+    parser.add_argument("--seed", default="minishell", help="seed for the synthetic trees")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per benchmark")
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="where trees are generated and cached")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON file to compare median latencies against")
+    options = parser.parse_args()
+
+    cases = CASES
+    if options.only:
+        names = set(options.only.split(","))
+        cases = [case for case in CASES if case['name'] in names]
+
+    workdir = os.path.abspath(options.workdir)
+    run_dir = os.path.join(workdir, "run")
+    scratch = os.path.join(run_dir, "scratch")
+    remove(run_dir)
+    os.makedirs(scratch)
+
+    tree_infos = {}
+    for name in sorted({case['tree'] for case in cases if case['tree']}):
+        print(f"Preparing tree {name}...", file=sys.stderr)
+        tree_infos[name] = trees.ensure_tree(workdir, name, options.scale, options.seed)
+
+    os.environ["XDG_DATA_HOME"] = os.path.join(run_dir, "xdg")
+    os.chdir(run_dir)
+    from core.shell import MiniShell
+
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            shell = MiniShell()
+        for case in cases:
+            print(f"Running {case['name']}...", file=sys.stderr)
+            with contextlib.redirect_stdout(devnull):
+                results.append(run_case(shell, case, tree_infos.get(case['tree']), scratch,
+                                        options.repeat, options.warmup))
+
+    commit, dirty = git_revision()
+    report = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'scale': options.scale,
+            'seed': options.seed,
+            'repeat': options.repeat,
+            'warmup': options.warmup,
+            'trees': tree_infos,
+        },
+        'results': results,
+    }
+
+    for result in results:
+        throughput = f"{result['throughput_mb_s']:9.1f} MB/s" if result['throughput_mb_s'] else " " * 14
+        print(f"{result['name']:16} {result['latency_s']['median'] * 1000:10.2f} ms {throughput} "
+              f"{result['peak_rss_kb'] / 1024:8.1f} MiB RSS", file=sys.stderr)
+    if options.compare:
+        print(compare(results, options.compare), file=sys.stderr)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import json
+import random
+import shutil
+import hashlib
+from core import utils
+
+TREES_VERSION = 1
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+         "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip "
+         "ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum").split()
+NEEDLE_EVERY = 500
+HUGE_FILE_SIZE = 64 * utils.MIB
+TEXT_BLOCK_SIZE = utils.MIB
+TINY_FILES = 50000
+TINY_FILES_PER_DIR = 1000
+DEEP_LEVELS = 200
+DEEP_FILES_PER_LEVEL = 5
+MIXED_FILES = 2000
+MIXED_DIRS = 20
+MIXED_MAX_SIZE = 4 * utils.MIB
+
+
+def text_block(rng, size):
+    lines = []
+    total = 0
+    number = 0
+    while total < size:
+        if number % NEEDLE_EVERY == 0:
+            line = f"needle {rng.randrange(10 ** 6)} {' '.join(rng.choices(WORDS, k=6))}\n"
+        else:
+            line = " ".join(rng.choices(WORDS, k=rng.randint(4, 14))) + "\n"
+        lines.append(line)
+        total += len(line)
+        number += 1
+    return "".join(lines).encode()[:size]
+
+
+def make_huge(root, rng, scale):
+    size = int(HUGE_FILE_SIZE * scale)
+    block = text_block(rng, TEXT_BLOCK_SIZE)
+    for n in range(2):
+        with open(os.path.join(root, f"text_{n}.txt"), 'wb') as f:
+            written = 0
+            while written < size:
+                chunk = block[:size - written]
+                f.write(chunk)
+                written += len(chunk)
+    with open(os.path.join(root, "random.bin"), 'wb') as f:
+        for _ in range(0, size, TEXT_BLOCK_SIZE):
+            f.write(rng.randbytes(TEXT_BLOCK_SIZE))
+
+
+def make_tiny(root, rng, scale):
+    count = int(TINY_FILES * scale)
+    for n in range(count):
+        dir_path = os.path.join(root, f"d{n // TINY_FILES_PER_DIR:04}")
+        if n % TINY_FILES_PER_DIR == 0:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, f"f{n:07}.txt"), 'wb') as f:
+            f.write(text_block(rng, rng.randint(0, 512)))
+
+
+def make_deep(root, rng, scale):
+    dir_path = root
+    for level in range(max(1, int(DEEP_LEVELS * min(scale, 1)))):
+        dir_path = os.path.join(dir_path, f"level_{level:03}")
+        os.makedirs(dir_path)
+        for n in range(DEEP_FILES_PER_LEVEL):
+            with open(os.path.join(dir_path, f"f{n}.txt"), 'wb') as f:
+                f.write(text_block(rng, 1024))
+
+
+def make_mixed(root, rng, scale):
+    for n in range(int(MIXED_FILES * scale)):
+        dir_path = os.path.join(root, f"dir_{n % MIXED_DIRS:02}")
+        os.makedirs(dir_path, exist_ok=True)
+        size = min(int(rng.lognormvariate(9.5, 1.5)), MIXED_MAX_SIZE)
+        if n % 2:
+            name, data = f"blob_{n:05}.bin", rng.randbytes(size)
+        else:
+            name, data = f"text_{n:05}.txt", text_block(rng, size)
+        with open(os.path.join(dir_path, name), 'wb') as f:
+            f.write(data)
+
+
+GENERATORS = {
+    "huge": make_huge,
+    "tiny": make_tiny,
+    "deep": make_deep,
+    "mixed": make_mixed,
+}
+
+
+def fingerprint(name, scale, seed):
+    key = json.dumps([TREES_VERSION, name, scale, seed]).encode()
+    return hashlib.sha256(key).hexdigest()[:12]
+
+
+def ensure_tree(workdir, name, scale, seed):
+    tree_id = fingerprint(name, scale, seed)
+    root = os.path.join(workdir, "trees", f"{name}-{tree_id}")
+    marker = os.path.join(root, ".complete.json")
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    data_root = os.path.join(root, name)
+    os.makedirs(data_root)
+    GENERATORS[name](data_root, random.Random(f"{seed}:{name}"), scale)
+
+    files = 0
+    total = 0
+    for entry in utils.walk_entries(data_root):
+        files += 1
+        total += entry.stat().st_size
+    info = {'name': name, 'id': tree_id, 'path': data_root, 'files': files, 'bytes': total}
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    return info
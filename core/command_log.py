@@ -0,0 +1,114 @@
+import os
+import json
+import atexit
+import datetime
+import threading
+from collections import deque
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+FLUSH_INTERVAL = 1.0
+FLUSH_SIZE = 256
+BUFFER_SIZE = 4096
+
+
+class CommandLogWriter:
+
+    def __init__(self, path, log_format="text", max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE, buffer_size=BUFFER_SIZE):
+        self.path = os.path.abspath(path)
+        self.log_format = log_format
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.buffer_size = buffer_size
+
+        self.buffer = deque()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+
+        self.file = self.open_file()
+        self.thread = threading.Thread(target=self.run, name="command-log-flusher", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def open_file(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        f = open(self.path, 'a', encoding='utf-8')
+        if is_new and self.log_format == "text":
+            f.write("Shell Log\n")
+            f.write("=" * 50 + "\n")
+            f.flush()
+        return f
+
+    def format_entry(self, command, success, error_msg):
+        now = datetime.datetime.now()
+        if self.log_format == "json":
+            entry = {'timestamp': now.isoformat(timespec='milliseconds'), 'command': command, 'success': success}
+            if not success:
+                entry['error'] = error_msg
+            return json.dumps(entry, ensure_ascii=False) + "\n"
+
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{timestamp}] {command}\n"
+        if not success:
+            line += f"[{timestamp}] ERROR: {error_msg}\n"
+        return line
+
+    def write(self, command, success=True, error_msg=""):
+        line = self.format_entry(command, success, error_msg)
+        if self.closed:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            return
+
+        with self.lock:
+            self.buffer.append(line)
+            pending = len(self.buffer)
+
+        if pending >= self.buffer_size:
+            self.flush()
+        elif pending >= self.flush_size:
+            self.wakeup.set()
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not self.buffer:
+                    return
+                lines, self.buffer = self.buffer, deque()
+
+            self.file.write("".join(lines))
+            self.file.flush()
+            if self.max_bytes and os.fstat(self.file.fileno()).st_size >= self.max_bytes:
+                self.rotate()
+
+    def rotate(self):
+        self.file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = self.open_file()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+        self.file.close()
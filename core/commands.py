@@ -1,7 +1,11 @@
 import os
-import shutil
+import sys
+import stat
 import datetime
+from collections import deque
 from . import utils
+from . import copy_engine
+from . import delete_engine
 
 
 class EasyCommands:
@@ -10,6 +14,16 @@ class EasyCommands:
         self.shell = shell
 
     def ls(self, args):
+        try:
+            utils.write_lines(self.ls_lines(args))
+            utils.log_command(self.shell.log_file, f"ls {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"ls {' '.join(args)}", False, error_msg)
+
+    def ls_lines(self, args, upstream=None):
         path = self.shell.current_dir
         detailed = False
 
@@ -19,43 +33,29 @@ class EasyCommands:
             elif not arg.startswith("-"):
                 path = utils.parse_path(self.shell.current_dir, arg)
 
-        try:
-            if not os.path.exists(path):
-                error_msg = f"No such file or directory: {path}"
-                print(f"ERROR: {error_msg}")
-                utils.log_command(self.shell.log_file, f"ls {' '.join(args)}", False, error_msg)
-                return
+        if not self.shell.stat_cache.exists(path):
+            raise FileNotFoundError(f"No such file or directory: {path}")
 
-            items = os.listdir(path)
-
-            if detailed:
-                for item in items:
-                    item_path = os.path.join(path, item)
-                    if os.path.exists(item_path):
-                        stat = os.stat(item_path)
-                        size = stat.st_size
-                        mtime = datetime.datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                        if os.path.isdir(item_path):
-                            perms = "d"
-                        elif os.access(item_path, os.X_OK):
-                            perms = "x"
-                        else:
-                            perms = "-"
-
-                        print(f"{perms} {item:20} {size:10} bytes {mtime}")
-            else:
-                for item in items:
-                    if os.path.isdir(os.path.join(path, item)):
-                        print(f"{item}/")
-                    else:
-                        print(item)
-
-            utils.log_command(self.shell.log_file, f"ls {' '.join(args)}", True)
+        if not detailed:
+            for name, is_dir in self.shell.stat_cache.listdir(path):
+                yield f"{name}/" if is_dir else name
+            return
 
-        except Exception as e:
-            error_msg = str(e)
-            print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"ls {' '.join(args)}", False, error_msg)
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                mtime = datetime.datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                if stat.S_ISDIR(st.st_mode):
+                    perms = "d"
+                elif st.st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+                    perms = "x"
+                else:
+                    perms = "-"
+
+                yield f"{perms} {entry.name:20} {st.st_size:10} bytes {mtime}"
 
     def cd(self, args):
         if not args:
@@ -64,7 +64,7 @@ class EasyCommands:
             new_dir = utils.parse_path(self.shell.current_dir, args[0])
 
         try:
-            if os.path.exists(new_dir) and os.path.isdir(new_dir):
+            if self.shell.stat_cache.isdir(new_dir):
                 os.chdir(new_dir)
                 self.shell.current_dir = os.getcwd()
                 utils.log_command(self.shell.log_file, f"cd {' '.join(args)}", True)
@@ -78,30 +78,69 @@ class EasyCommands:
             print(f"ERROR: {error_msg}")
             utils.log_command(self.shell.log_file, f"cd {' '.join(args)}", False, error_msg)
 
+    def cat_options(self, args):
+        positional, options = utils.split_args(args, value_options=("--head", "--tail"), flags=("-n",))
+        head = int(options["--head"]) if "--head" in options else None
+        tail = int(options["--tail"]) if "--tail" in options else None
+        if (head is not None and head < 0) or (tail is not None and tail < 0):
+            raise ValueError
+        return positional, "-n" in options, head, tail
+
     def cat(self, args):
-        if not args:
+        usage = "ERROR: Usage: cat <file> [-n] [--head N] [--tail N]"
+
+        try:
+            positional, number, head, tail = self.cat_options(args)
+        except ValueError:
+            print(usage)
+            utils.log_command(self.shell.log_file, f"cat {' '.join(args)}", False, "Invalid arguments")
+            return
+
+        if not positional:
             print("ERROR: File name required")
             utils.log_command(self.shell.log_file, "cat", False, "File name required")
             return
 
-        file_path = utils.parse_path(self.shell.current_dir, args[0])
+        file_path = utils.parse_path(self.shell.current_dir, positional[0])
 
         try:
-            if os.path.isdir(file_path):
+            if self.shell.stat_cache.isdir(file_path):
                 error_msg = f"Is a directory: {file_path}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"cat {' '.join(args)}", False, error_msg)
                 return
 
-            if not os.path.exists(file_path):
+            if not self.shell.stat_cache.exists(file_path):
                 error_msg = f"No such file: {file_path}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"cat {' '.join(args)}", False, error_msg)
                 return
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(content)
+            sys.stdout.flush()
+            out = sys.stdout.buffer
+
+            with open(file_path, 'rb') as f:
+                if tail is not None:
+                    f.seek(utils.tail_offset(f, tail))
+
+                if not number and head is None:
+                    last = utils.copy_stream(f, out)
+                else:
+                    last = b""
+                    count = 0
+                    for piece, line_start in utils.line_chunks(f):
+                        if line_start:
+                            if head is not None and count >= head:
+                                break
+                            count += 1
+                            if number:
+                                out.write(f"{count:6}\t".encode())
+                        out.write(piece)
+                        last = piece[-1:]
+
+                if last and last != b"\n":
+                    out.write(b"\n")
+            out.flush()
 
             utils.log_command(self.shell.log_file, f"cat {' '.join(args)}", True)
 
@@ -110,17 +149,70 @@ class EasyCommands:
             print(f"ERROR: {error_msg}")
             utils.log_command(self.shell.log_file, f"cat {' '.join(args)}", False, error_msg)
 
+    def cat_lines(self, args, upstream=None):
+        try:
+            positional, number, head, tail = self.cat_options(args)
+        except ValueError:
+            raise ValueError("Usage: cat [file] [-n] [--head N] [--tail N]") from None
+
+        if positional:
+            lines = self.file_lines(utils.parse_path(self.shell.current_dir, positional[0]), tail)
+        elif upstream is not None:
+            lines = enumerate(deque(upstream, maxlen=tail) if tail is not None else upstream, start=1)
+        else:
+            raise ValueError("File name required")
+
+        for count, (line_num, line) in enumerate(lines):
+            if head is not None and count >= head:
+                return
+            yield f"{line_num:6}\t{line}" if number else line
+
+    def file_lines(self, file_path, tail=None):
+        if self.shell.stat_cache.isdir(file_path):
+            raise IsADirectoryError(f"Is a directory: {file_path}")
+        if not self.shell.stat_cache.exists(file_path):
+            raise FileNotFoundError(f"No such file: {file_path}")
+
+        with open(file_path, 'rb') as f:
+            if tail is not None:
+                f.seek(utils.tail_offset(f, tail))
+
+            line_num = 0
+            pieces = []
+            for piece, line_start in utils.line_chunks(f):
+                if line_start and pieces:
+                    line_num += 1
+                    yield line_num, b"".join(pieces).rstrip(b"\r\n").decode('utf-8', errors='replace')
+                    pieces = []
+                pieces.append(piece)
+            if pieces:
+                yield line_num + 1, b"".join(pieces).rstrip(b"\r\n").decode('utf-8', errors='replace')
+
     def cp(self, args):
+        usage = "ERROR: Usage: cp <source> <destination> [-r] [-j N] [--update|--resume] [--checksum]"
+
         if len(args) < 2:
-            print("ERROR: Usage: cp <source> <destination> [-r]")
+            print(usage)
             utils.log_command(self.shell.log_file, "cp", False, "Incorrect number of arguments")
             return
 
-        recursive = "-r" in args
-        source_args = [arg for arg in args if arg != "-r" and not arg.startswith("-")]
+        try:
+            source_args, options = utils.split_args(args, value_options=("-j",),
+                                                   flags=("-r", "--update", "--resume", "--checksum"))
+            workers = int(options.get("-j", copy_engine.DEFAULT_WORKERS))
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            print(usage)
+            utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", False, "Invalid arguments")
+            return
+
+        recursive = "-r" in options
+        update = "--update" in options or "--resume" in options
+        checksum = "--checksum" in options
 
         if len(source_args) < 2:
-            print("ERROR: Usage: cp <source> <destination> [-r]")
+            print(usage)
             utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", False, "Incorrect number of arguments")
             return
 
@@ -128,26 +220,48 @@ class EasyCommands:
         destination = utils.parse_path(self.shell.current_dir, source_args[1])
 
         try:
-            if not os.path.exists(source):
+            if not self.shell.stat_cache.exists(source):
                 error_msg = f"No such file or directory: {source}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", False, error_msg)
                 return
 
-            if os.path.isdir(source) and not recursive:
+            if self.shell.stat_cache.isdir(source) and not recursive:
                 error_msg = f"{source} is a directory (use -r to copy recursively)"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", False, error_msg)
                 return
 
-            self.shell.last_command = 'cp'
-            self.shell.last_command_args = {'source': source, 'destination': destination, 'recursive': recursive}
+            if not self.shell.stat_cache.isdir(source) and self.shell.stat_cache.isdir(destination):
+                destination = os.path.join(destination, os.path.basename(source))
 
-            if os.path.isdir(source):
-                shutil.copytree(source, destination)
+            existed = os.path.lexists(destination)
+
+            if self.shell.stat_cache.isdir(source):
+                progress = utils.ProgressReporter("cp")
+
+                def report(done, total, done_bytes, total_bytes, elapsed):
+                    progress.update(done_bytes, done_bytes / total_bytes if total_bytes else 1, f"{done}/{total} files")
+
+                try:
+                    result = copy_engine.copy_tree(source, destination, workers, report, update=update,
+                                                   checksum=checksum, cancel=self.shell.cancellation())
+                finally:
+                    progress.finish()
+                created = [destination] if not existed else result['copied']
+                rate = result['bytes'] / max(result['elapsed'], 1e-9) / (1024 * 1024)
+                print(f"Copied {result['files']} files, skipped {result['skipped']} up to date "
+                      f"({result['bytes']} bytes) in {result['elapsed']:.2f} s, {rate:.1f} MiB/s")
             else:
-                shutil.copy2(source, destination)
+                st = os.stat(source)
+                if copy_engine.sync_file(source, destination, st.st_size, st.st_mtime_ns, update, checksum) is None:
+                    print(f"Skipped {source}: {destination} is up to date")
+                    utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", True)
+                    return
+                created = [destination]
 
+            if created:
+                self.shell.journal.record('cp', f"cp {' '.join(args)}", {'paths': created})
             print(f"Copied {source} to {destination}")
             utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", True)
 
@@ -157,25 +271,32 @@ class EasyCommands:
             utils.log_command(self.shell.log_file, f"cp {' '.join(args)}", False, error_msg)
 
     def mv(self, args):
-        if len(args) < 2:
-            print("ERROR: Usage: mv <source> <destination>")
+        usage = "ERROR: Usage: mv [--checksum] [--] <source> <destination>"
+
+        try:
+            path_args, options = utils.split_args(args, flags=("--checksum",))
+        except ValueError:
+            print(usage)
+            utils.log_command(self.shell.log_file, f"mv {' '.join(args)}", False, "Invalid arguments")
+            return
+
+        if len(path_args) != 2:
+            print(usage)
             utils.log_command(self.shell.log_file, "mv", False, "Incorrect number of arguments")
             return
 
-        source = utils.parse_path(self.shell.current_dir, args[0])
-        destination = utils.parse_path(self.shell.current_dir, args[1])
+        source = utils.parse_path(self.shell.current_dir, path_args[0])
+        destination = utils.parse_path(self.shell.current_dir, path_args[1])
 
         try:
-            if not os.path.exists(source):
+            if not self.shell.stat_cache.exists(source):
                 error_msg = f"No such file or directory: {source}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"mv {' '.join(args)}", False, error_msg)
                 return
 
-            self.shell.last_command = 'mv'
-            self.shell.last_command_args = {'source': source, 'destination': destination}
-
-            shutil.move(source, destination)
+            destination = copy_engine.move(source, destination, "--checksum" in options)
+            self.shell.journal.record('mv', f"mv {' '.join(args)}", {'source': source, 'destination': destination})
             print(f"Moved {source} to {destination}")
             utils.log_command(self.shell.log_file, f"mv {' '.join(args)}", True)
 
@@ -185,19 +306,25 @@ class EasyCommands:
             utils.log_command(self.shell.log_file, f"mv {' '.join(args)}", False, error_msg)
 
     def rm(self, args):
-        if not args:
-            print("ERROR: Usage: rm <path> [-r]")
-            utils.log_command(self.shell.log_file, "rm", False, "Incorrect number of arguments")
-            return
+        usage = "ERROR: Usage: rm <path> [-r] [-f] [--no-trash] [-j N]"
 
-        recursive = "-r" in args
-        path_args = [arg for arg in args if arg != "-r" and not arg.startswith("-")]
+        try:
+            path_args, options = utils.split_args(args, value_options=("-j",), flags=("-r", "-f", "--no-trash"))
+            workers = int(options.get("-j", delete_engine.DEFAULT_WORKERS))
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            print(usage)
+            utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, "Invalid arguments")
+            return
 
         if not path_args:
-            print("ERROR: Usage: rm <path> [-r]")
-            utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, "Incorrect number of arguments")
+            print(usage)
+            utils.log_command(self.shell.log_file, f"rm {' '.join(args)}".strip(), False, "Incorrect number of arguments")
             return
 
+        recursive = "-r" in options
+        no_trash = "--no-trash" in options
         target = utils.parse_path(self.shell.current_dir, path_args[0])
 
         safe, error_msg = utils.is_safe_to_delete(target, self.shell.current_dir)
@@ -207,39 +334,51 @@ class EasyCommands:
             return
 
         try:
-            if not os.path.exists(target):
+            if not self.shell.stat_cache.exists(target):
                 error_msg = f"No such file or directory: {target}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, error_msg)
                 return
 
-            if os.path.isdir(target) and not recursive:
+            if self.shell.stat_cache.isdir(target) and not recursive:
                 error_msg = f"{target} is a directory (use -r to remove recursively)"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, error_msg)
                 return
 
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            trash_item = os.path.join(self.shell.trash_dir, f"{os.path.basename(target)}_{timestamp}")
-
-            self.shell.last_command = 'rm'
-            self.shell.last_command_args = {'target': target, 'trash_item': trash_item}
-
-            if os.path.isdir(target):
+            is_dir = self.shell.stat_cache.isdir(target)
+            if is_dir and "-f" not in options and self.shell.interactive():
                 response = input(f"Remove directory '{target}' and all its contents? (y/n): ")
                 if response.lower() != 'y':
                     print("Cancelled")
                     return
 
-                shutil.move(target, trash_item)
-                print(f"Removed directory: {target}")
-            else:
-                shutil.move(target, trash_item)
-                print(f"Removed file: {target}")
+            if no_trash:
+                self.delete_permanently(target, workers)
+                utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", True)
+                return
+
+            entry = self.shell.trash.put(target)
+            print(f"Removed directory: {target}" if is_dir else f"Removed file: {target}")
+
+            self.shell.journal.record('rm', f"rm {' '.join(args)}", {'target': target, 'trash_item': entry['item']})
 
             utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, error_msg)
\ No newline at end of file
+            utils.log_command(self.shell.log_file, f"rm {' '.join(args)}", False, error_msg)
+
+    def delete_permanently(self, target, workers):
+        progress = utils.ProgressReporter("rm", unit="files")
+
+        def report(files, dirs, elapsed):
+            progress.update(files, None, f"{dirs} directories")
+
+        try:
+            result = delete_engine.delete_tree(target, workers, report, self.shell.cancellation())
+        finally:
+            progress.finish()
+        print(f"Permanently removed {target}: {result['files']} files, {result['dirs']} directories "
+              f"in {result['elapsed']:.2f} s")
@@ -0,0 +1,416 @@
+import os
+import stat
+import time
+import errno
+import shutil
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from . import delete_engine, utils
+
+DEFAULT_WORKERS = 8
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+TRANSFER_CHUNK = 64 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+JOURNAL_FLUSH_EVERY = 256
+
+
+def zero_copy(src_fd, dst_fd, size, start=0):
+    copy_range = getattr(os, "copy_file_range", None)
+    offset = start
+    end = start + size
+    while offset < end:
+        count = min(TRANSFER_CHUNK, end - offset)
+        if copy_range:
+            try:
+                sent = copy_range(src_fd, dst_fd, count, offset, offset)
+            except OSError:
+                copy_range = None
+                continue
+        else:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            sent = os.sendfile(dst_fd, src_fd, offset, count)
+        if sent == 0:
+            break
+        offset += sent
+    return offset - start
+
+
+def data_extents(fd, size):
+    seek_data = getattr(os, "SEEK_DATA", None)
+    if seek_data is None:
+        if size:
+            yield 0, size
+        return
+
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, seek_data)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                return
+            if offset == 0:
+                yield 0, size
+                return
+            raise
+        if start >= size:
+            return
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        yield start, end - start
+        offset = end
+
+
+def hashed_copy(src_fd, dst_fd, size, start, digest):
+    offset = start
+    end = start + size
+    while offset < end:
+        data = os.pread(src_fd, min(HASH_CHUNK, end - offset), offset)
+        if not data:
+            break
+        digest.update(offset.to_bytes(8, 'little'))
+        digest.update(data)
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(dst_fd, view, offset)
+            view = view[written:]
+            offset += written
+    return offset - start
+
+
+def extents_digest(fd, extents):
+    digest = hashlib.blake2b()
+    for start, size in extents:
+        offset = start
+        while offset < start + size:
+            data = os.pread(fd, min(HASH_CHUNK, start + size - offset), offset)
+            if not data:
+                break
+            digest.update(offset.to_bytes(8, 'little'))
+            digest.update(data)
+            offset += len(data)
+    return digest.digest()
+
+
+def sparse_copy(src_fd, dst_fd, size, verify=False):
+    digest = hashlib.blake2b() if verify else None
+    extents = []
+    copied = 0
+    for start, length in data_extents(src_fd, size):
+        extents.append((start, length))
+        if digest is None:
+            done = zero_copy(src_fd, dst_fd, length, start)
+        else:
+            done = hashed_copy(src_fd, dst_fd, length, start, digest)
+        copied += done
+        if done < length:
+            raise OSError(errno.EIO, f"Short copy: {done} of {length} bytes at offset {start}")
+    os.ftruncate(dst_fd, size)
+
+    if digest is not None:
+        os.fsync(dst_fd)
+        if extents_digest(dst_fd, extents) != digest.digest():
+            raise OSError(errno.EIO, "Checksum mismatch after copy")
+    return copied
+
+
+def copy_file(src, dst, size=None):
+    if size is None:
+        size = os.stat(src).st_size
+
+    if size < LARGE_FILE_SIZE:
+        shutil.copy2(src, dst)
+        return size
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            sparse_copy(fsrc.fileno(), fdst.fileno(), size)
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    shutil.copystat(src, dst)
+    return size
+
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
+
+
+def is_up_to_date(src, dst, size, mtime_ns, checksum=False):
+    try:
+        st = os.stat(dst)
+    except OSError:
+        return False
+    if st.st_size != size:
+        return False
+    if checksum:
+        return file_digest(src) == file_digest(dst)
+    return st.st_mtime_ns == mtime_ns
+
+
+def sync_file(src, dst, size, mtime_ns, update=False, checksum=False):
+    if update and is_up_to_date(src, dst, size, mtime_ns, checksum):
+        return None
+    return copy_file(src, dst, size)
+
+
+class CopyJournal:
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip("\n").split(" ", 2)
+                    if len(parts) == 3:
+                        self.done[parts[2]] = (int(parts[0]), int(parts[1]))
+        self.file = open(path, 'a', encoding='utf-8')
+        self.unflushed = 0
+
+    def is_done(self, dst, size, mtime_ns):
+        return self.done.get(dst) == (mtime_ns, size)
+
+    def record(self, dst, size, mtime_ns):
+        self.file.write(f"{mtime_ns} {size} {dst}\n")
+        self.unflushed += 1
+        if self.unflushed >= JOURNAL_FLUSH_EVERY:
+            self.file.flush()
+            self.unflushed = 0
+
+    def close(self, completed):
+        self.file.close()
+        if completed:
+            os.remove(self.path)
+
+
+def journal_path_for(dst):
+    dst = os.path.abspath(dst)
+    return os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.cpjournal")
+
+
+def scan_tree(src, dst, errors):
+    dirs = [(src, dst)]
+    files = []
+    links = []
+    stack = [(src, dst)]
+
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        try:
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    target = os.path.join(dst_dir, entry.name)
+                    if entry.is_symlink():
+                        links.append((entry.path, target))
+                    elif entry.is_dir(follow_symlinks=False):
+                        dirs.append((entry.path, target))
+                        stack.append((entry.path, target))
+                    else:
+                        try:
+                            st = entry.stat()
+                            size, mtime_ns = st.st_size, st.st_mtime_ns
+                        except OSError:
+                            size, mtime_ns = 0, 0
+                        files.append((entry.path, target, size, mtime_ns))
+        except OSError as e:
+            errors.append((src_dir, dst_dir, str(e)))
+
+    return dirs, files, links
+
+
+def copy_link(src, dst, update=False):
+    link_target = os.readlink(src)
+    if update and os.path.islink(dst):
+        if os.readlink(dst) == link_target:
+            return False
+        os.unlink(dst)
+    os.symlink(link_target, dst)
+    return True
+
+
+def copy_tree(src, dst, workers=DEFAULT_WORKERS, report=None, update=False, checksum=False, cancel=None):
+    start = time.perf_counter()
+    errors = []
+    dirs, files, links = scan_tree(src, dst, errors)
+    total_bytes = sum(size for _, _, size, _ in files)
+
+    os.makedirs(dst, exist_ok=update)
+    for _, dst_dir in dirs[1:]:
+        os.makedirs(dst_dir, exist_ok=True)
+
+    journal = CopyJournal(journal_path_for(dst)) if update else None
+    copied = []
+    skipped = 0
+    done_bytes = 0
+    pending = {}
+
+    for s, d in links:
+        try:
+            if copy_link(s, d, update):
+                copied.append(d)
+            else:
+                skipped += 1
+        except OSError as e:
+            errors.append((s, d, str(e)))
+
+    def collect(done):
+        nonlocal done_bytes, skipped
+        for future in done:
+            s, d, size, mtime_ns = pending.pop(future)
+            try:
+                result = future.result()
+            except OSError as e:
+                errors.append((s, d, str(e)))
+                continue
+            if result is None:
+                skipped += 1
+                done_bytes += size
+                continue
+            done_bytes += result
+            copied.append(d)
+            if journal:
+                journal.record(d, size, mtime_ns)
+        if report:
+            report(len(copied) + skipped, len(files), done_bytes, total_bytes, time.perf_counter() - start)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for s, d, size, mtime_ns in files:
+                if utils.is_cancelled(cancel):
+                    break
+                if journal and journal.is_done(d, size, mtime_ns):
+                    skipped += 1
+                    done_bytes += size
+                    continue
+                if len(pending) >= workers * 16:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                future = executor.submit(sync_file, s, d, size, mtime_ns, update, checksum)
+                pending[future] = (s, d, size, mtime_ns)
+
+            while pending:
+                if utils.is_cancelled(cancel):
+                    for future in [future for future in pending if future.cancel()]:
+                        del pending[future]
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+    finally:
+        if journal:
+            journal.close(completed=not errors and not pending and not utils.is_cancelled(cancel))
+
+    utils.check_cancelled(cancel)
+
+    for src_dir, dst_dir in reversed(dirs):
+        try:
+            shutil.copystat(src_dir, dst_dir)
+        except OSError as e:
+            errors.append((src_dir, dst_dir, str(e)))
+
+    if errors:
+        raise shutil.Error(errors)
+
+    return {
+        'files': len(copied),
+        'skipped': skipped,
+        'bytes': done_bytes,
+        'elapsed': time.perf_counter() - start,
+        'copied': copied,
+    }
+
+
+def make_special(src, dst, st):
+    if stat.S_ISFIFO(st.st_mode):
+        os.mkfifo(dst, stat.S_IMODE(st.st_mode))
+    elif stat.S_ISCHR(st.st_mode) or stat.S_ISBLK(st.st_mode):
+        os.mknod(dst, st.st_mode, st.st_rdev)
+    else:
+        raise OSError(errno.EOPNOTSUPP, f"Cannot move special file: {src}")
+
+
+def transfer_file(src, dst, verify=False, created=None):
+    st = os.lstat(src)
+    if not stat.S_ISREG(st.st_mode):
+        make_special(src, dst, st)
+        if created is not None:
+            created.append(dst)
+        shutil.copystat(src, dst, follow_symlinks=False)
+        return 0
+
+    with open(src, 'rb') as fsrc:
+        with open(dst, 'x+b') as fdst:
+            if created is not None:
+                created.append(dst)
+            copied = sparse_copy(fsrc.fileno(), fdst.fileno(), st.st_size, verify)
+    shutil.copystat(src, dst)
+    return copied
+
+
+def transfer(src, dst, verify=False, created=None):
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        if created is not None:
+            created.append(dst)
+        return 0
+    if not os.path.isdir(src):
+        return transfer_file(src, dst, verify, created)
+
+    copied = 0
+    dirs = [(src, dst)]
+    os.mkdir(dst)
+    if created is not None:
+        created.append(dst)
+    stack = [(src, dst)]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    os.mkdir(target)
+                    dirs.append((entry.path, target))
+                    stack.append((entry.path, target))
+                else:
+                    copied += transfer_file(entry.path, target, verify)
+
+    for src_dir, dst_dir in reversed(dirs):
+        shutil.copystat(src_dir, dst_dir)
+    return copied
+
+
+def move_across(src, dst, verify=False):
+    tmp_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{os.getpid()}.mvpart")
+    created = []
+    try:
+        transfer(src, tmp_path, verify, created)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        delete_engine.delete_paths(created)
+        raise
+    delete_engine.delete_paths([src])
+
+
+def move(src, dst, verify=False):
+    if os.path.isdir(dst) and not os.path.islink(dst):
+        dst = os.path.join(dst, os.path.basename(src.rstrip(os.sep)))
+        if os.path.lexists(dst):
+            raise FileExistsError(f"Destination path '{dst}' already exists")
+
+    real_src = os.path.realpath(src)
+    if os.path.isdir(src) and os.path.realpath(dst).startswith(real_src + os.sep):
+        raise ValueError(f"Cannot move a directory '{src}' into itself '{dst}'")
+
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        move_across(src, dst, verify)
+    return dst
@@ -0,0 +1,186 @@
+import os
+import stat
+import time
+import errno
+import shutil
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from . import utils
+
+DEFAULT_WORKERS = 8
+FAN_OUT = 4
+MAX_EXPANDED = 256
+DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+USE_DIR_FD = (os.scandir in os.supports_fd and os.open in os.supports_dir_fd
+              and os.unlink in os.supports_dir_fd and os.rmdir in os.supports_dir_fd)
+
+
+def open_dir(parent_fd, name, expected=None):
+    fd = os.open(name, DIR_FLAGS, dir_fd=parent_fd)
+    if expected is not None and not os.path.samestat(os.fstat(fd), expected):
+        os.close(fd)
+        raise OSError(errno.ESTALE, f"Directory was replaced during removal: {name}")
+    return fd
+
+
+def clear_dir(fd, path, errors):
+    files = 0
+    subdirs = []
+    try:
+        with os.scandir(fd) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.name, entry.stat(follow_symlinks=False)))
+                    else:
+                        os.unlink(entry.name, dir_fd=fd)
+                        files += 1
+                except OSError as e:
+                    errors.append((os.path.join(path, entry.name), str(e)))
+    except OSError as e:
+        errors.append((path, str(e)))
+    return files, subdirs
+
+
+def remove_subtree(parent_fd, name, expected, path, cancel=None):
+    errors = []
+    if utils.is_cancelled(cancel):
+        return 0, 0, errors
+    try:
+        fd = open_dir(parent_fd, name, expected)
+    except OSError as e:
+        return 0, 0, [(path, str(e))]
+
+    files, subdirs = clear_dir(fd, path, errors)
+    dirs = 0
+    stack = [(fd, path, subdirs, parent_fd, name)]
+    while stack:
+        fd, path, subdirs, parent_fd, name = stack[-1]
+        if subdirs and utils.is_cancelled(cancel):
+            for fd, *_ in stack:
+                os.close(fd)
+            break
+        if subdirs:
+            child, st = subdirs.pop()
+            child_path = os.path.join(path, child)
+            try:
+                child_fd = open_dir(fd, child, st)
+            except OSError as e:
+                errors.append((child_path, str(e)))
+                continue
+            removed, grandchildren = clear_dir(child_fd, child_path, errors)
+            files += removed
+            stack.append((child_fd, child_path, grandchildren, fd, child))
+            continue
+
+        stack.pop()
+        os.close(fd)
+        try:
+            os.rmdir(name, dir_fd=parent_fd)
+            dirs += 1
+        except OSError as e:
+            errors.append((path, str(e)))
+    return files, dirs, errors
+
+
+def delete_paths(paths, workers=DEFAULT_WORKERS, report=None, cancel=None):
+    start = time.perf_counter()
+    errors = []
+    tops = []
+    files = 0
+    dirs = 0
+
+    for path in paths:
+        path = os.path.abspath(path)
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            tops.append((path, st))
+        else:
+            try:
+                os.unlink(path)
+                files += 1
+            except OSError as e:
+                errors.append((path, str(e)))
+
+    if not USE_DIR_FD:
+        for path, _ in tops:
+            try:
+                shutil.rmtree(path)
+                dirs += 1
+            except OSError as e:
+                errors.append((path, str(e)))
+        tops = []
+
+    parents = []
+    expanded = []
+    frontier = deque()
+    try:
+        for path, st in tops:
+            try:
+                parent_fd = os.open(os.path.dirname(path), os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+            except OSError as e:
+                errors.append((path, str(e)))
+                continue
+            parents.append(parent_fd)
+            frontier.append((parent_fd, os.path.basename(path), st, path))
+
+        while frontier and len(frontier) < workers * FAN_OUT and len(expanded) < MAX_EXPANDED:
+            utils.check_cancelled(cancel)
+            parent_fd, name, st, path = frontier.popleft()
+            try:
+                fd = open_dir(parent_fd, name, st)
+            except OSError as e:
+                errors.append((path, str(e)))
+                continue
+            expanded.append((fd, parent_fd, name, path))
+            removed, subdirs = clear_dir(fd, path, errors)
+            files += removed
+            frontier.extend((fd, child, child_st, os.path.join(path, child)) for child, child_st in subdirs)
+
+        if report:
+            report(files, dirs, time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(remove_subtree, *item, cancel): item for item in frontier}
+            while pending:
+                for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                    del pending[future]
+                    removed, removed_dirs, subtree_errors = future.result()
+                    files += removed
+                    dirs += removed_dirs
+                    errors.extend(subtree_errors)
+                if report:
+                    report(files, dirs, time.perf_counter() - start)
+
+        utils.check_cancelled(cancel)
+        while expanded:
+            fd, parent_fd, name, path = expanded.pop()
+            os.close(fd)
+            try:
+                os.rmdir(name, dir_fd=parent_fd)
+                dirs += 1
+            except OSError as e:
+                errors.append((path, str(e)))
+        if report:
+            report(files, dirs, time.perf_counter() - start)
+    finally:
+        for fd, *_ in expanded:
+            os.close(fd)
+        for fd in parents:
+            os.close(fd)
+
+    if errors:
+        raise shutil.Error(errors)
+
+    return {
+        'files': files,
+        'dirs': dirs,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def delete_tree(path, workers=DEFAULT_WORKERS, report=None, cancel=None):
+    return delete_paths([path], workers, report, cancel)
@@ -0,0 +1,209 @@
+import io
+import sys
+import time
+import threading
+from collections import deque
+from core import utils
+
+DEFAULT_WORKERS = 8
+FOREGROUND_ONLY = frozenset(("cd", "jobs", "fg", "wait", "kill", "exit"))
+CONFIRM_FIRST = {"rm": "-r"}
+CANCELLABLE = frozenset(("cp", "rm", "grep", "zip", "tar", "unzip", "untar", "du", "dupes"))
+
+
+class OutputRouter:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def target(self):
+        return getattr(self.local, 'stream', None) or self.stream
+
+    def attach(self, stream):
+        self.local.stream = stream
+
+    def detach(self):
+        self.local.stream = None
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def isatty(self):
+        return self.target().isatty()
+
+    @property
+    def buffer(self):
+        return self.target().buffer
+
+    def __getattr__(self, name):
+        return getattr(self.target(), name)
+
+
+class Job:
+
+    def __init__(self, job_id, cmd, args, command, cwd):
+        import tempfile
+
+        self.id = job_id
+        self.cmd = cmd
+        self.args = args
+        self.command = command
+        self.cwd = cwd
+        self.status = "Running"
+        self.error = None
+        self.started = time.time()
+        self.elapsed = None
+        self.future = None
+        self.cancelled = utils.Cancellation()
+        self.running = False
+        self.output = io.TextIOWrapper(tempfile.TemporaryFile(), encoding='utf-8', errors='replace',
+                                       write_through=True)
+
+    def running_time(self):
+        return self.elapsed if self.elapsed is not None else time.time() - self.started
+
+    def read_output(self):
+        raw = self.output.buffer
+        raw.seek(0)
+        data = raw.read()
+        self.output.close()
+        return data
+
+
+class JobManager:
+
+    def __init__(self, shell, workers=DEFAULT_WORKERS):
+        self.shell = shell
+        self.workers = workers
+        self.jobs = {}
+        self.next_id = 1
+        self.finished = deque()
+        self.lock = threading.Lock()
+        self.loop = None
+        self.executor = None
+        self.router = None
+        self.local = threading.local()
+
+    def start(self):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.loop.set_default_executor(self.executor)
+        threading.Thread(target=self.loop.run_forever, name="jobs", daemon=True).start()
+        self.router = OutputRouter(sys.stdout)
+        sys.stdout = self.router
+
+    def current(self):
+        return getattr(self.local, 'job', None)
+
+    @staticmethod
+    def needs_confirmation(cmd, args):
+        flag = CONFIRM_FIRST.get(cmd)
+        return flag is not None and flag in args and "-f" not in args
+
+    def submit(self, cmd, args, command, cwd):
+        import asyncio
+
+        if cmd in FOREGROUND_ONLY:
+            raise ValueError(f"{cmd} cannot run in the background")
+        if self.loop is None:
+            self.start()
+
+        with self.lock:
+            job = Job(self.next_id, cmd, args, command, cwd)
+            self.next_id += 1
+            self.jobs[job.id] = job
+        job.future = asyncio.run_coroutine_threadsafe(self.run_job(job), self.loop)
+        return job
+
+    async def run_job(self, job):
+        started = time.perf_counter()
+        try:
+            await self.loop.run_in_executor(self.executor, self.execute, job)
+            job.status = "Killed" if job.cancelled.fired else "Done"
+        except utils.Cancelled:
+            job.status = "Killed"
+        except Exception as e:
+            job.status = "Failed"
+            job.error = str(e)
+        job.elapsed = time.perf_counter() - started
+        with self.lock:
+            self.finished.append(job)
+
+    def execute(self, job):
+        if job.cancelled.is_set():
+            job.cancelled.fired = True
+            return
+        job.running = True
+        self.local.job = job
+        self.router.attach(job.output)
+        try:
+            self.shell.execute_command(job.cmd, job.args, job.command)
+        finally:
+            self.router.detach()
+            self.local.job = None
+
+    def find(self, spec=None):
+        with self.lock:
+            if spec is None:
+                return self.jobs[max(self.jobs)] if self.jobs else None
+            spec = spec.lstrip("%")
+            return self.jobs.get(int(spec)) if spec.isdigit() else None
+
+    def wait(self, job, timeout=None):
+        job.future.result(timeout)
+
+    def kill(self, job):
+        with self.lock:
+            if job.status != "Running" or job.cancelled.is_set():
+                return False
+            job.cancelled.set()
+            job.status = "Killing"
+        return True
+
+    @staticmethod
+    def interruptible(job):
+        return not job.running or job.cmd in CANCELLABLE
+
+    def collect(self, job=None):
+        with self.lock:
+            if job is None:
+                jobs = list(self.finished)
+                self.finished.clear()
+            elif job in self.finished:
+                self.finished.remove(job)
+                jobs = [job]
+            else:
+                jobs = []
+            for finished in jobs:
+                del self.jobs[finished.id]
+        return jobs
+
+    def report(self, job):
+        output = job.read_output()
+        if output:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(output)
+            sys.stdout.buffer.flush()
+        status = job.status if job.error is None else f"{job.status}: {job.error}"
+        print(f"[{job.id}] {status} ({job.elapsed:.2f} s)  {job.command}")
+
+    def report_finished(self):
+        for job in self.collect():
+            self.report(job)
+
+    def running(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if not job.future.done()]
+
+    def close(self):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
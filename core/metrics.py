@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import math
+import time
+import atexit
+import threading
+from . import utils
+
+STATS_WINDOW = 10000
+FLUSH_EVERY = 64
+HISTOGRAM_EDGES = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+TOUCH_EVENTS = frozenset(("open", "os.rename", "os.remove", "os.rmdir", "os.mkdir", "os.truncate", "os.utime"))
+
+
+_local = threading.local()
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def audit(event, args):
+    if event in TOUCH_EVENTS and getattr(_local, 'touched', None) is not None:
+        if event != "open" or isinstance(args[0], (str, bytes, os.PathLike)):
+            _local.touched += 1
+
+
+def install_audit_hook():
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(audit)
+            _hook_installed = True
+
+
+def io_counters():
+    try:
+        with open("/proc/self/io", 'rb') as f:
+            fields = dict(line.split(b":", 1) for line in f.read().splitlines())
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class CommandMetrics:
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.pending = []
+        self.active = 0
+        self.started = 0
+        self.lock = threading.Lock()
+        install_audit_hook()
+        atexit.register(self.flush)
+
+    def start(self):
+        depth = getattr(_local, 'depth', 0)
+        if depth == 0:
+            _local.touched = 0
+        _local.depth = depth + 1
+        with self.lock:
+            if depth == 0:
+                self.active += 1
+                self.started += 1
+            exclusive = self.active == 1
+            started = self.started
+        return time.perf_counter(), time.thread_time(), io_counters(), _local.touched, exclusive, started
+
+    def finish(self, cmd, sample):
+        wall_started, cpu_started, io_started, touched_started, exclusive, started = sample
+        io_finished = io_counters()
+        wall = time.perf_counter() - wall_started
+        cpu = time.thread_time() - cpu_started
+        files = _local.touched - touched_started
+        _local.depth -= 1
+        outermost = _local.depth == 0
+        if outermost:
+            _local.touched = None
+
+        with self.lock:
+            exclusive = exclusive and self.active == 1 and self.started == started
+            if outermost:
+                self.active -= 1
+
+        record = {'command': cmd, 'time': time.time(), 'wall': wall, 'cpu': cpu, 'files': files}
+        if io_started and io_finished and exclusive:
+            record['read'] = io_finished[0] - io_started[0]
+            record['written'] = io_finished[1] - io_started[1]
+        with self.lock:
+            self.pending.append(json.dumps(record) + "\n")
+            flush = len(self.pending) >= FLUSH_EVERY
+        if flush:
+            self.flush()
+        return record
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            lines, self.pending = self.pending, []
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+    def load(self, window=STATS_WINDOW):
+        self.flush()
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'rb') as f:
+            f.seek(utils.tail_offset(f, window))
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def summary(self, records):
+        groups = {}
+        for record in records:
+            groups.setdefault(record['command'], []).append(record)
+
+        rows = []
+        for cmd, samples in sorted(groups.items()):
+            walls = sorted(sample['wall'] for sample in samples)
+            rows.append({
+                'command': cmd,
+                'count': len(samples),
+                'p50': percentile(walls, 0.50),
+                'p95': percentile(walls, 0.95),
+                'p99': percentile(walls, 0.99),
+                'max': walls[-1],
+                'cpu': sum(sample['cpu'] for sample in samples) / len(samples),
+                'read': sum(sample.get('read', 0) for sample in samples),
+                'written': sum(sample.get('written', 0) for sample in samples),
+                'files': sum(sample['files'] for sample in samples),
+            })
+        return rows
+
+    def histogram(self, records):
+        counts = [0] * (len(HISTOGRAM_EDGES) + 1)
+        for record in records:
+            ms = record['wall'] * 1000
+            bucket = 0
+            while bucket < len(HISTOGRAM_EDGES) and ms >= HISTOGRAM_EDGES[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
@@ -0,0 +1,110 @@
+import importlib
+import threading
+
+ENTRY_POINT_GROUP = "minishell.commands"
+
+BUILTIN_COMMANDS = {
+    "ls": ("core.commands", "EasyCommands", "ls"),
+    "cd": ("core.commands", "EasyCommands", "cd"),
+    "cat": ("core.commands", "EasyCommands", "cat"),
+    "cp": ("core.commands", "EasyCommands", "cp"),
+    "mv": ("core.commands", "EasyCommands", "mv"),
+    "rm": ("core.commands", "EasyCommands", "rm"),
+
+    "zip": ("plugins.archives", "ArchivesPlugin", "zip_cmd"),
+    "unzip": ("plugins.archives", "ArchivesPlugin", "unzip"),
+    "tar": ("plugins.archives", "ArchivesPlugin", "tar"),
+    "untar": ("plugins.archives", "ArchivesPlugin", "untar"),
+    "codecs": ("plugins.archives", "ArchivesPlugin", "codecs_cmd"),
+    "grep": ("plugins.search", "SearchPlugin", "grep"),
+    "index": ("plugins.search", "SearchPlugin", "index_cmd"),
+    "du": ("plugins.disk", "DiskPlugin", "du_cmd"),
+    "dupes": ("plugins.disk", "DiskPlugin", "dupes_cmd"),
+    "trash": ("plugins.trash", "TrashPlugin", "trash_cmd"),
+    "history": ("plugins.history", "HistoryPlugin", "history_cmd"),
+    "undo": ("plugins.history", "HistoryPlugin", "undo"),
+    "redo": ("plugins.history", "HistoryPlugin", "redo"),
+    "jobs": ("plugins.jobs", "JobsPlugin", "jobs_cmd"),
+    "fg": ("plugins.jobs", "JobsPlugin", "fg_cmd"),
+    "wait": ("plugins.jobs", "JobsPlugin", "wait_cmd"),
+    "kill": ("plugins.jobs", "JobsPlugin", "kill_cmd"),
+    "stats": ("plugins.stats", "StatsPlugin", "stats_cmd"),
+    "profile": ("plugins.stats", "StatsPlugin", "profile_cmd"),
+}
+
+BUILTIN_STREAMS = {
+    "ls": ("core.commands", "EasyCommands", "ls_lines"),
+    "cat": ("core.commands", "EasyCommands", "cat_lines"),
+    "grep": ("plugins.search", "SearchPlugin", "grep_lines"),
+    "history": ("plugins.history", "HistoryPlugin", "history_lines"),
+    "du": ("plugins.disk", "DiskPlugin", "du_lines"),
+    "dupes": ("plugins.disk", "DiskPlugin", "dupes_lines"),
+    "head": ("plugins.pipes", "PipePlugin", "head"),
+    "tail": ("plugins.pipes", "PipePlugin", "tail"),
+    "wc": ("plugins.pipes", "PipePlugin", "wc"),
+}
+
+
+class CommandRegistry:
+
+    def __init__(self, shell):
+        self.shell = shell
+        self.commands = dict(BUILTIN_COMMANDS)
+        self.streams = dict(BUILTIN_STREAMS)
+        self.handlers = {}
+        self.plugins = {}
+        self.discovered = False
+        self.lock = threading.RLock()
+
+    def register(self, name, module, class_name, method):
+        self.commands[name] = (module, class_name, method)
+        self.handlers.pop(name, None)
+
+    def plugin(self, module, class_name):
+        key = (module, class_name)
+        instance = self.plugins.get(key)
+        if instance is None:
+            with self.lock:
+                instance = self.plugins.get(key)
+                if instance is None:
+                    plugin_class = getattr(importlib.import_module(module), class_name)
+                    instance = self.plugins[key] = plugin_class(self.shell)
+        return instance
+
+    def discover(self):
+        from importlib import metadata
+
+        try:
+            entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError:
+            entry_points = metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+
+        for entry_point in entry_points:
+            class_name, _, method = entry_point.attr.partition(".")
+            self.commands.setdefault(entry_point.name, (entry_point.module, class_name, method or entry_point.name))
+        self.discovered = True
+
+    def resolve(self, name):
+        handler = self.handlers.get(name)
+        if handler is not None:
+            return handler
+
+        spec = self.commands.get(name)
+        if spec is None and not self.discovered:
+            with self.lock:
+                if not self.discovered:
+                    self.discover()
+            spec = self.commands.get(name)
+        if spec is None:
+            return None
+
+        module, class_name, method = spec
+        handler = self.handlers[name] = getattr(self.plugin(module, class_name), method)
+        return handler
+
+    def resolve_stream(self, name):
+        spec = self.streams.get(name)
+        if spec is None:
+            return None
+        module, class_name, method = spec
+        return getattr(self.plugin(module, class_name), method)
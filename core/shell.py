@@ -1,61 +1,153 @@
 import os
+import sys
+import time
+import threading
 from core import utils
-from core.commands import EasyCommands
-from plugins.archives import ArchivesPlugin
-from plugins.search import SearchPlugin
-from plugins.history import HistoryPlugin
+from core.registry import CommandRegistry
+from core.trash_store import DEFAULT_MAX_AGE, DEFAULT_QUOTA
+
+BATCH_LOG_OPTIONS = {'flush_interval': 5.0, 'flush_size': 8192, 'buffer_size': 65536}
 
 
 class MiniShell:
 
-    def __init__(self):
-        self.current_dir = os.getcwd()
+    def __init__(self, log_format="text", history_limit=10000, trash_max_age=DEFAULT_MAX_AGE,
+                 trash_quota=DEFAULT_QUOTA, batch=False):
+        self.batch = batch
+        self.cwd = os.getcwd()
         self.log_file = "shell.log"
+        self.log_format = log_format
         self.history_file = ".history"
-        self.trash_dir = ".trash"
+        self.history_limit = history_limit
+        self.journal_file = os.path.abspath(".journal")
+        self.stats_file = os.path.abspath(".stats")
+        self.trash_max_age = trash_max_age
+        self.trash_quota = trash_quota
+        self.index_dir = os.path.abspath(".index")
         self.history = []
         self.command_count = 0
-        self.last_command = None
-        self.last_command_args = None
+        self.services = {}
+        self.services_lock = threading.Lock()
 
         self.setup()
         self.init_modules()
 
     def setup(self):
-        utils.setup_logging(self.log_file)
-        self.setup_trash()
-
-    def setup_trash(self):
-        if not os.path.exists(self.trash_dir):
-            os.makedirs(self.trash_dir, exist_ok=True)
+        utils.setup_logging(self.log_file, self.log_format, **(BATCH_LOG_OPTIONS if self.batch else {}))
 
     def init_modules(self):
-        self.easy_commands = EasyCommands(self)
-        self.archives = ArchivesPlugin(self)
-        self.search = SearchPlugin(self)
-        self.history_plugin = HistoryPlugin(self)
+        self.registry = CommandRegistry(self)
+
+    def service(self, name, factory):
+        instance = self.services.get(name)
+        if instance is None:
+            with self.services_lock:
+                instance = self.services.get(name)
+                if instance is None:
+                    instance = self.services[name] = factory()
+        return instance
+
+    def create_trash(self):
+        from core.trash_store import TrashStore
+
+        trash = TrashStore(max_age=self.trash_max_age, quota=self.trash_quota, log_file=self.log_file)
+        trash.start()
+        return trash
+
+    def create_journal(self):
+        from core.undo_journal import OperationJournal
+
+        journal = OperationJournal(self.journal_file)
+        journal.load()
+        return journal
+
+    def create_metrics(self):
+        from core.metrics import CommandMetrics
+
+        return CommandMetrics(self.stats_file)
+
+    def create_stat_cache(self):
+        from core.stat_cache import StatCache
+
+        return StatCache()
+
+    def create_jobs(self):
+        from core.jobs import JobManager
+
+        return JobManager(self)
+
+    @property
+    def trash(self):
+        return self.service("trash", self.create_trash)
 
-        self.history_plugin.load_history()
+    @property
+    def journal(self):
+        return self.service("journal", self.create_journal)
+
+    @property
+    def metrics(self):
+        return self.service("metrics", self.create_metrics)
+
+    @property
+    def stat_cache(self):
+        return self.service("stat_cache", self.create_stat_cache)
+
+    @property
+    def jobs(self):
+        return self.service("jobs", self.create_jobs)
+
+    @property
+    def easy_commands(self):
+        return self.registry.plugin("core.commands", "EasyCommands")
+
+    @property
+    def archives(self):
+        return self.registry.plugin("plugins.archives", "ArchivesPlugin")
+
+    @property
+    def search(self):
+        return self.registry.plugin("plugins.search", "SearchPlugin")
+
+    @property
+    def history_plugin(self):
+        return self.registry.plugin("plugins.history", "HistoryPlugin")
+
+    @property
+    def trash_plugin(self):
+        return self.registry.plugin("plugins.trash", "TrashPlugin")
+
+    @property
+    def current_dir(self):
+        job = self.jobs.current() if "jobs" in self.services else None
+        return job.cwd if job is not None else self.cwd
+
+    @current_dir.setter
+    def current_dir(self, path):
+        self.cwd = path
+
+    def cancellation(self):
+        job = self.jobs.current() if "jobs" in self.services else None
+        return job.cancelled if job is not None else None
+
+    def interactive(self):
+        return not self.batch and ("jobs" not in self.services or self.jobs.current() is None)
 
     def run(self):
         while True:
             try:
+                if "jobs" in self.services:
+                    self.jobs.report_finished()
                 command_input = input(f"{self.current_dir}> ").strip()
 
                 if not command_input:
                     continue
 
                 if command_input.lower() == 'exit':
+                    self.wait_jobs()
                     print("Выход из оболочки")
                     break
 
-                self.history_plugin.add_to_history(command_input)
-
-                parts = command_input.split()
-                cmd = parts[0].lower()
-                args = parts[1:] if len(parts) > 1 else []
-
-                self.execute_command(cmd, args, command_input)
+                self.execute_line(command_input)
 
             except KeyboardInterrupt:
                 print("\nДля выхода введите 'exit'")
@@ -68,35 +160,149 @@ class MiniShell:
                                   False,
                                   f"Unexpected error: {e}")
 
+    def execute_line(self, command_input):
+        if not self.batch:
+            self.history_plugin.add_to_history(command_input)
+
+        parts = command_input.split()
+        cmd = parts[0].lower()
+        args = parts[1:] if len(parts) > 1 else []
+
+        self.execute_command(cmd, args, command_input)
+
+    @staticmethod
+    def parse_script(text):
+        commands = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            for command_input in line.split(";"):
+                parts = command_input.split()
+                if parts:
+                    commands.append((parts[0].lower(), parts[1:], " ".join(parts)))
+        return commands
+
+    def run_script(self, text):
+        timings = []
+        started = time.perf_counter()
+
+        for cmd, args, command_input in self.parse_script(text):
+            if cmd == 'exit':
+                break
+
+            command_started = time.perf_counter()
+            try:
+                self.execute_command(cmd, args, command_input)
+            except Exception as e:
+                print(f"Неожиданная ошибка: {e}")
+                utils.log_command(self.log_file, command_input, False, f"Unexpected error: {e}")
+            timings.append((command_input, time.perf_counter() - command_started))
+
+        self.wait_jobs()
+        total = time.perf_counter() - started
+        sys.stdout.flush()
+        report = [f"{elapsed * 1000:10.3f} ms  {command_input}" for command_input, elapsed in timings]
+        report.append(f"{len(timings)} commands in {total:.3f} s")
+        sys.stderr.write("\n".join(report) + "\n")
+        return timings
+
+    def wait_jobs(self):
+        if "jobs" not in self.services:
+            return
+        running = self.jobs.running()
+        if running:
+            print(f"Ожидание фоновых заданий: {len(running)}")
+        for job in running:
+            self.jobs.wait(job)
+        self.jobs.report_finished()
+
+    @staticmethod
+    def split_background(cmd, args):
+        if args and args[-1] == "&":
+            return cmd, args[:-1], True
+        if args and args[-1].endswith("&"):
+            return cmd, args[:-1] + [args[-1][:-1]], True
+        if not args and len(cmd) > 1 and cmd.endswith("&"):
+            return cmd[:-1], [], True
+        return cmd, args, False
+
+    def start_job(self, cmd, args, full_command):
+        command = full_command.rstrip().rstrip("&").rstrip()
+        try:
+            if self.jobs.needs_confirmation(cmd, args) and self.interactive():
+                response = input(f"Run '{command}' in the background without further confirmation? (y/n): ")
+                if response.lower() != 'y':
+                    print("Cancelled")
+                    return
+            job = self.jobs.submit(cmd, args, command, self.current_dir)
+            print(f"[{job.id}] {command}")
+            utils.log_command(self.log_file, full_command, True)
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.log_file, full_command, False, error_msg)
+
     def execute_command(self, cmd, args, full_command):
-        if cmd == "ls":
-            self.easy_commands.ls(args)
-        elif cmd == "cd":
-            self.easy_commands.cd(args)
-        elif cmd == "cat":
-            self.easy_commands.cat(args)
-        elif cmd == "cp":
-            self.easy_commands.cp(args)
-        elif cmd == "mv":
-            self.easy_commands.mv(args)
-        elif cmd == "rm":
-            self.easy_commands.rm(args)
-
-        elif cmd == "zip":
-            self.archives.zip_cmd(args)
-        elif cmd == "unzip":
-            self.archives.unzip(args)
-        elif cmd == "tar":
-            self.archives.tar(args)
-        elif cmd == "untar":
-            self.archives.untar(args)
-        elif cmd == "grep":
-            self.search.grep(args)
-        elif cmd == "history":
-            self.history_plugin.history_cmd(args)
-        elif cmd == "undo":
-            self.history_plugin.undo(args)
-
-        else:
+        cmd, args, background = self.split_background(cmd, args)
+        if background:
+            self.start_job(cmd, args, full_command)
+            return
+
+        self.stat_cache.sync()
+        if "|" in args:
+            self.execute_pipeline(cmd, args, full_command)
+            return
+
+        handler = self.registry.resolve(cmd)
+        if handler is None and self.registry.resolve_stream(cmd) is not None:
+            self.execute_pipeline(cmd, args, full_command)
+            return
+        if handler is None:
             print(f"Неизвестная команда: {cmd}")
-            utils.log_command(self.log_file, full_command, False, f"Unknown command: {cmd}")
\ No newline at end of file
+            utils.log_command(self.log_file, full_command, False, f"Unknown command: {cmd}")
+            return
+
+        sample = self.metrics.start()
+        try:
+            handler(args)
+        finally:
+            self.metrics.finish(cmd, sample)
+
+    @staticmethod
+    def split_pipeline(cmd, args):
+        stages = [(cmd, [])]
+        for arg in args:
+            if arg == "|":
+                stages.append(None)
+            elif stages[-1] is None:
+                stages[-1] = (arg.lower(), [])
+            else:
+                stages[-1][1].append(arg)
+        if None in stages:
+            raise ValueError("Empty command in pipeline")
+        return stages
+
+    def execute_pipeline(self, cmd, args, full_command):
+        sample = self.metrics.start()
+        generators = []
+        try:
+            upstream = None
+            for name, stage_args in self.split_pipeline(cmd, args):
+                stream = self.registry.resolve_stream(name)
+                if stream is None:
+                    raise ValueError(f"Command cannot be used in a pipeline: {name}")
+                upstream = stream(stage_args, upstream)
+                generators.append(upstream)
+
+            utils.write_lines(upstream)
+            utils.log_command(self.log_file, full_command, True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.log_file, full_command, False, error_msg)
+        finally:
+            for generator in reversed(generators):
+                generator.close()
+            self.metrics.finish("pipeline" if "|" in args else cmd, sample)
@@ -0,0 +1,325 @@
+import os
+import sys
+import stat
+import time
+import struct
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = 8192
+MAX_WATCHES = 4096
+MTIME_MIN_AGE_NS = 2 * 10 ** 9
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+MEMBERSHIP_EVENTS = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | MEMBERSHIP_EVENTS | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+PATH_EVENTS = {
+    "os.remove": (0,),
+    "os.truncate": (0,),
+    "os.utime": (0,),
+    "os.chmod": (0,),
+    "os.chown": (0,),
+    "os.mkdir": (0,),
+    "os.symlink": (1,),
+    "os.link": (1,),
+}
+TREE_EVENTS = {
+    "os.rename": (0, 1),
+    "os.rmdir": (0,),
+    "shutil.rmtree": (0,),
+    "shutil.move": (0, 1),
+    "shutil.copytree": (1,),
+}
+DIR_FD_ARGS = {"os.remove": 1, "os.rmdir": 1, "os.mkdir": 2, "os.rename": 2, "shutil.rmtree": 1}
+AUDITED_EVENTS = frozenset(PATH_EVENTS) | frozenset(TREE_EVENTS) | {"open"}
+
+_target = None
+_hook_installed = False
+_hook_lock = threading.Lock()
+
+
+def audit(event, args):
+    cache = _target
+    if cache is not None and event in AUDITED_EVENTS:
+        cache.audit(event, args)
+
+
+def detach_in_child():
+    global _target
+    _target = None
+
+
+def attach(cache):
+    global _target, _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(audit)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=detach_in_child)
+            _hook_installed = True
+        _target = cache
+
+
+def detach(cache):
+    global _target
+    with _hook_lock:
+        if _target is cache:
+            _target = None
+
+
+def normalize(path):
+    if isinstance(path, bytes):
+        path = os.fsdecode(path)
+    return os.path.normpath(os.path.abspath(path))
+
+
+class Inotify:
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        return wd if wd >= 0 else None
+
+    def read_events(self):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, pos)
+                pos += EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StatCache:
+
+    def __init__(self, size=CACHE_SIZE, max_watches=MAX_WATCHES, use_inotify=True):
+        self.size = size
+        self.max_watches = max_watches
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.inotify = None
+        self.inotify_started = False
+        self.watches = {}
+        self.watched = {}
+        self.stats = OrderedDict()
+        self.listings = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.RLock()
+        attach(self)
+
+    def start_inotify(self):
+        self.inotify_started = True
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError):
+            self.inotify = None
+
+    def watch(self, directory):
+        if directory in self.watched:
+            return True
+        if self.use_inotify and not self.inotify_started:
+            self.start_inotify()
+        if self.inotify is None or len(self.watches) >= self.max_watches:
+            return False
+        wd = self.inotify.add_watch(directory)
+        if wd is None:
+            return False
+        self.watches[wd] = directory
+        self.watched[directory] = wd
+        return True
+
+    def sync(self):
+        with self.lock:
+            self.generation += 1
+            if self.inotify is None:
+                return
+            for wd, mask, name in self.inotify.read_events():
+                if mask & IN_Q_OVERFLOW:
+                    self.clear()
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.watches[wd]
+                    del self.watched[directory]
+                    self.drop(directory, tree=True)
+                elif name:
+                    self.drop(os.path.join(directory, name), tree=bool(mask & IN_ISDIR))
+                    if mask & MEMBERSHIP_EVENTS:
+                        self.drop(directory)
+                else:
+                    self.drop(directory, tree=bool(mask & (IN_DELETE_SELF | IN_MOVE_SELF)))
+
+    def audit(self, event, args):
+        if event == "open":
+            if args[2] & WRITE_FLAGS and isinstance(args[0], (str, bytes)):
+                self.invalidate_file(args[0], args[2] & os.O_CREAT)
+            return
+
+        tree = event in TREE_EVENTS
+        positions = TREE_EVENTS.get(event) or PATH_EVENTS.get(event)
+        if positions is None:
+            return
+        dir_fd = DIR_FD_ARGS.get(event)
+        relative = dir_fd is not None and dir_fd < len(args) and args[dir_fd] not in (None, -1)
+        for position in positions:
+            path = args[position]
+            if not isinstance(path, (str, bytes)):
+                continue
+            if relative and not os.path.isabs(path):
+                self.clear()
+                return
+            self.invalidate(path, tree)
+
+    def invalidate(self, path, tree=False):
+        path = normalize(path)
+        with self.lock:
+            self.drop(path, tree)
+            self.drop(os.path.dirname(path))
+
+    def invalidate_file(self, path, create):
+        path = normalize(path)
+        with self.lock:
+            cached = self.stats.pop(path, None)
+            if cached is not None:
+                self.invalidations += 1
+            if create and (cached is None or cached[0] is None):
+                self.drop(os.path.dirname(path))
+
+    def drop(self, path, tree=False):
+        removed = self.stats.pop(path, None) is not None
+        removed = self.listings.pop(path, None) is not None or removed
+        if tree:
+            prefix = path.rstrip(os.sep) + os.sep
+            for cache in (self.stats, self.listings):
+                for key in [key for key in cache if key.startswith(prefix)]:
+                    del cache[key]
+                    removed = True
+        if removed:
+            self.invalidations += 1
+
+    def clear(self):
+        if not self.stats and not self.listings:
+            return
+        with self.lock:
+            self.stats.clear()
+            self.listings.clear()
+            self.invalidations += 1
+
+    def store(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.size:
+            cache.popitem(last=False)
+
+    def stat(self, path):
+        path = normalize(path)
+        with self.lock:
+            cached = self.stats.get(path)
+            if cached is not None and (cached[1] or cached[2] == self.generation):
+                self.stats.move_to_end(path)
+                self.hits += 1
+                return cached[0]
+
+            self.misses += 1
+            watched = self.watch(os.path.dirname(path))
+            try:
+                result = os.lstat(path)
+                if stat.S_ISLNK(result.st_mode):
+                    watched = False
+                    result = os.stat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                result = None
+            if result is not None and stat.S_ISDIR(result.st_mode):
+                watched = self.watch(path) and watched
+            self.store(self.stats, path, (result, watched, self.generation))
+            return result
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def isdir(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def isfile(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def listdir(self, path):
+        path = normalize(path)
+        with self.lock:
+            cached = self.listings.get(path)
+            if cached is not None:
+                entries, watched, dir_mtime = cached
+                if watched or dir_mtime == os.stat(path).st_mtime_ns:
+                    self.listings.move_to_end(path)
+                    self.hits += 1
+                    return entries
+
+            self.misses += 1
+            watched = self.watch(path)
+            dir_mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = [(entry.name, entry.is_dir()) for entry in it]
+
+            if watched or time.time_ns() - dir_mtime > MTIME_MIN_AGE_NS:
+                self.store(self.listings, path, (entries, watched, dir_mtime))
+            return entries
+
+    def counters(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self.stats) + len(self.listings),
+                'watches': len(self.watches),
+                'inotify': self.inotify is not None,
+            }
+
+    def close(self):
+        detach(self)
+        with self.lock:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+            self.watches.clear()
+            self.watched.clear()
+            self.clear()
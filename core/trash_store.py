@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import atexit
+import datetime
+import threading
+from . import utils
+
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+DEFAULT_QUOTA = 10 * 1024 ** 3
+GC_INTERVAL = 600
+QUOTA_MIN_AGE = 3600
+INDEX_NAME = "minishell-index.jsonl"
+
+
+def home_trash_dir():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, "Trash")
+
+
+def mount_point(path):
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def tree_size(path):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return 0
+    if not os.path.isdir(path) or os.path.islink(path):
+        return st.st_size
+    total = st.st_size
+    for entry in utils.walk_entries(path):
+        try:
+            total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
+class TrashStore:
+
+    def __init__(self, home=None, max_age=DEFAULT_MAX_AGE, quota=DEFAULT_QUOTA, gc_interval=GC_INTERVAL,
+                 log_file=None):
+        self.home = os.path.abspath(home or home_trash_dir())
+        self.index_path = os.path.join(self.home, INDEX_NAME)
+        self.max_age = max_age
+        self.quota = quota
+        self.gc_interval = gc_interval
+        self.log_file = log_file
+        self.uid = os.getuid() if hasattr(os, "getuid") else 0
+
+        self.entries = {}
+        self.roots = {}
+        self.records = 0
+        self.index_file = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.loaded = threading.Event()
+        self.closed = False
+        self.thread = None
+
+    def start(self):
+        self.ensure_root(self.home)
+        self.thread = threading.Thread(target=self.run, name="trash-gc", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def ensure_root(self, root):
+        os.makedirs(os.path.join(root, "files"), mode=0o700, exist_ok=True)
+        os.makedirs(os.path.join(root, "info"), mode=0o700, exist_ok=True)
+        return root
+
+    def root_for(self, path):
+        dev = os.lstat(path).st_dev
+        root = self.roots.get(dev)
+        if root is None:
+            root = self.home
+            if os.stat(self.home).st_dev != dev:
+                top_root = os.path.join(mount_point(os.path.dirname(os.path.abspath(path))), f".Trash-{self.uid}")
+                try:
+                    root = self.ensure_root(top_root)
+                except OSError:
+                    root = self.home
+            self.roots[dev] = root
+        return root
+
+    def load(self):
+        self.entries = {}
+        self.records = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records += 1
+                    op = record.pop('op', None)
+                    if op == 'add':
+                        self.entries[record['item']] = record
+                    elif op == 'remove':
+                        self.entries.pop(record['item'], None)
+                    elif op == 'size' and record['item'] in self.entries:
+                        self.entries[record['item']]['size'] = record['size']
+
+        if self.records > len(self.entries) * 2 + 256:
+            self.compact()
+
+    def write_record(self, record):
+        if self.index_file is None:
+            self.index_file = open(self.index_path, 'a', encoding='utf-8')
+        self.index_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.index_file.flush()
+        self.records += 1
+
+    def compact(self):
+        if self.index_file:
+            self.index_file.close()
+            self.index_file = None
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(dict(entry, op='add'), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self.records = len(self.entries)
+
+    def reserve_name(self, root, path, name):
+        base = name or os.path.basename(os.path.normpath(path))
+        candidate = base
+        counter = 1
+        while True:
+            info = os.path.join(root, "info", f"{candidate}.trashinfo")
+            try:
+                fd = os.open(info, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                if name:
+                    raise FileExistsError(f"Trash entry already exists: {name}")
+                counter += 1
+                candidate = f"{base}.{counter}"
+                continue
+            return candidate, info, fd
+
+    def put(self, path, name=None):
+        import urllib.parse
+
+        self.loaded.wait()
+        path = os.path.abspath(path)
+        root = self.root_for(path)
+        name, info, fd = self.reserve_name(root, path, name)
+        deleted = time.time()
+        item = os.path.join(root, "files", name)
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("[Trash Info]\n")
+                f.write(f"Path={urllib.parse.quote(path)}\n")
+                f.write(f"DeletionDate={datetime.datetime.fromtimestamp(deleted).strftime('%Y-%m-%dT%H:%M:%S')}\n")
+            utils.move_path(path, item)
+        except BaseException:
+            os.remove(info)
+            raise
+
+        is_tree = os.path.isdir(item) and not os.path.islink(item)
+        entry = {'item': item, 'info': info, 'path': path, 'deleted': deleted,
+                 'size': None if is_tree else os.lstat(item).st_size}
+        with self.lock:
+            self.entries[item] = entry
+            self.write_record(dict(entry, op='add'))
+        return entry
+
+    def restore(self, item, destination=None):
+        self.loaded.wait()
+        with self.lock:
+            entry = self.entries.get(item)
+            if entry is None or not os.path.lexists(item):
+                raise FileNotFoundError(f"Not in trash: {item}")
+            destination = destination or entry['path']
+            if os.path.lexists(destination):
+                raise FileExistsError(f"Refusing to overwrite {destination}")
+
+            utils.move_path(item, destination)
+            if os.path.exists(entry['info']):
+                os.remove(entry['info'])
+            del self.entries[item]
+            self.write_record({'op': 'remove', 'item': item})
+        return destination
+
+    def list(self):
+        self.loaded.wait()
+        with self.lock:
+            return list(self.entries.values())
+
+    def find(self, key):
+        entries = self.list()
+        if key.isdigit() and 1 <= int(key) <= len(entries):
+            return entries[int(key) - 1]
+        key = os.path.abspath(key)
+        for entry in reversed(entries):
+            if entry['path'] == key or entry['item'] == key:
+                return entry
+        return None
+
+    def purge(self, entries, workers=None, report=None):
+        from . import delete_engine
+
+        with self.lock:
+            entries = [self.entries.pop(entry['item']) for entry in entries if entry['item'] in self.entries]
+        if not entries:
+            return entries
+
+        try:
+            delete_engine.delete_paths([entry['item'] for entry in entries],
+                                       workers or delete_engine.DEFAULT_WORKERS, report)
+        finally:
+            with self.lock:
+                for entry in entries:
+                    if os.path.lexists(entry['item']):
+                        self.entries[entry['item']] = entry
+                        continue
+                    if os.path.exists(entry['info']):
+                        os.remove(entry['info'])
+                    self.write_record({'op': 'remove', 'item': entry['item']})
+        return entries
+
+    def collect(self):
+        started = time.time()
+        for entry in self.list():
+            if entry['size'] is None:
+                size = tree_size(entry['item'])
+                with self.lock:
+                    if entry['item'] in self.entries:
+                        entry['size'] = size
+                        self.write_record({'op': 'size', 'item': entry['item'], 'size': size})
+
+        entries = [entry for entry in self.list() if entry['deleted'] < started]
+        expired = {}
+        for entry in entries:
+            if not os.path.lexists(entry['item']):
+                expired[entry['item']] = (entry, "missing")
+            elif self.max_age and started - entry['deleted'] > self.max_age:
+                expired[entry['item']] = (entry, "expired")
+
+        if self.quota:
+            kept = sorted((entry for entry in entries if entry['item'] not in expired), key=lambda entry: entry['deleted'])
+            total = sum(entry['size'] or 0 for entry in kept)
+            for entry in kept:
+                if total <= self.quota or started - entry['deleted'] < QUOTA_MIN_AGE:
+                    break
+                expired[entry['item']] = (entry, "over quota")
+                total -= entry['size'] or 0
+
+        purged = self.purge([entry for entry, _ in expired.values()])
+        if self.log_file:
+            for entry in purged:
+                reason = expired[entry['item']][1]
+                utils.log_command(self.log_file, f"trash gc: evicted {entry['path']} ({reason})", True)
+        with self.lock:
+            if self.records > len(self.entries) * 2 + 256:
+                self.compact()
+        return purged
+
+    def run(self):
+        try:
+            self.load()
+        finally:
+            self.loaded.set()
+
+        while not self.closed:
+            try:
+                self.collect()
+            except OSError:
+                pass
+            self.wakeup.wait(self.gc_interval)
+            self.wakeup.clear()
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        with self.lock:
+            if self.index_file:
+                self.index_file.close()
+                self.index_file = None
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+UNDO_LIMIT = 1000
+FLUSH_EVERY = 32
+FLUSH_INTERVAL = 1.0
+
+
+class OperationJournal:
+
+    def __init__(self, path, limit=UNDO_LIMIT):
+        self.path = os.path.abspath(path)
+        self.limit = limit
+        self.done = []
+        self.undone = []
+        self.next_id = 1
+        self.pending = []
+        self.first_pending = 0.0
+        self.records = 0
+        self.timer = None
+        self.lock = threading.RLock()
+        atexit.register(self.close)
+
+    def load(self):
+        self.done, self.undone = [], []
+        self.records = 0
+        if not os.path.exists(self.path):
+            return
+
+        steps = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.records += 1
+                action = record.get('action')
+                if action == 'do':
+                    step = {key: record[key] for key in ('id', 'command', 'line', 'args')}
+                    steps[step['id']] = step
+                    self.done.append(step)
+                    self.undone.clear()
+                    self.next_id = max(self.next_id, step['id'] + 1)
+                elif action == 'undo' and self.done and self.done[-1]['id'] == record['id']:
+                    self.undone.append(self.done.pop())
+                elif action == 'redo' and self.undone and self.undone[-1]['id'] == record['id']:
+                    self.done.append(self.undone.pop())
+
+        del self.done[:-self.limit]
+        if self.records > self.limit * 2:
+            self.compact()
+
+    def record(self, command, line, args):
+        with self.lock:
+            step = {'id': self.next_id, 'command': command, 'line': line, 'args': args}
+            self.next_id += 1
+            self.done.append(step)
+            self.undone.clear()
+            if len(self.done) > self.limit:
+                self.done.pop(0)
+            self.write(dict(step, action='do'))
+        return step
+
+    def last_done(self):
+        return self.done[-1] if self.done else None
+
+    def last_undone(self):
+        return self.undone[-1] if self.undone else None
+
+    def mark_undone(self, step):
+        with self.lock:
+            self.undone.append(self.done.pop())
+            self.write({'action': 'undo', 'id': step['id']})
+
+    def mark_redone(self, step):
+        with self.lock:
+            self.done.append(self.undone.pop())
+            self.write({'action': 'redo', 'id': step['id']})
+
+    def write(self, record):
+        if not self.pending:
+            self.first_pending = time.monotonic()
+            self.schedule_flush()
+        self.pending.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self.records += 1
+        if len(self.pending) >= FLUSH_EVERY or time.monotonic() - self.first_pending >= FLUSH_INTERVAL:
+            self.flush()
+
+    def schedule_flush(self):
+        self.timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            lines, self.pending = self.pending, []
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+
+            if self.records > self.limit * 2:
+                self.compact()
+
+    def compact(self):
+        self.pending = []
+        records = [dict(step, action='do') for step in self.done + self.undone[::-1]]
+        records += [{'action': 'undo', 'id': step['id']} for step in self.undone]
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.records = len(records)
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.flush()
@@ -1,5 +1,31 @@
 import os
-import datetime
+import sys
+import time
+import errno
+import threading
+from collections import deque
+from . import command_log
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Cancellation(threading.Event):
+
+    def __init__(self):
+        super().__init__()
+        self.fired = False
+
+
+def is_cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def check_cancelled(cancel):
+    if is_cancelled(cancel):
+        cancel.fired = True
+        raise Cancelled("Cancelled")
 
 
 def parse_path(current_dir, path):
@@ -13,19 +39,33 @@ def parse_path(current_dir, path):
         return os.path.join(current_dir, path)
 
 
-def setup_logging(log_file):
-    if not os.path.exists(log_file):
-        with open(log_file, 'w') as f:
-            f.write("Shell Log\n")
-            f.write("=" * 50 + "\n")
+_log_writers = {}
+
+
+def setup_logging(log_file, log_format="text", max_bytes=command_log.DEFAULT_MAX_BYTES,
+                  backups=command_log.DEFAULT_BACKUPS, **writer_options):
+    writer = _log_writers.get(log_file)
+    if writer:
+        writer.close()
+    _log_writers[log_file] = command_log.CommandLogWriter(log_file, log_format, max_bytes, backups,
+                                                          **writer_options)
+    return _log_writers[log_file]
+
+
+def get_log_writer(log_file):
+    writer = _log_writers.get(log_file)
+    if writer is None:
+        writer = setup_logging(log_file)
+    return writer
 
 
 def log_command(log_file, command, success=True, error_msg=""):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_file, 'a') as f:
-        f.write(f"[{timestamp}] {command}\n")
-        if not success:
-            f.write(f"[{timestamp}] ERROR: {error_msg}\n")
+    get_log_writer(log_file).write(command, success, error_msg)
+
+
+def flush_logs():
+    for writer in _log_writers.values():
+        writer.flush()
 
 
 def is_safe_to_delete(target, current_dir):
@@ -35,4 +75,224 @@ def is_safe_to_delete(target, current_dir):
     if target == ".." or os.path.abspath(target) == os.path.dirname(current_dir):
         return False, "Cannot delete parent directory"
 
-    return True, ""
\ No newline at end of file
+    return True, ""
+
+
+def move_path(source, destination, verify=False):
+    from . import copy_engine
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.rename(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_engine.move_across(source, destination, verify)
+
+
+def split_args(args, value_options=(), flags=()):
+    positional = []
+    options = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--":
+            positional.extend(args[i + 1:])
+            break
+        if arg in value_options:
+            if i + 1 >= len(args):
+                raise ValueError(f"Option {arg} requires a value")
+            options[arg] = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith("-") and len(arg) > 1:
+            if arg not in flags:
+                raise ValueError(f"Unknown option: {arg}")
+            options[arg] = True
+        else:
+            positional.append(arg)
+        i += 1
+    return positional, options
+
+
+def ordered_map(executor, fn, items, max_pending):
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(fn, item)))
+        if len(pending) >= max_pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def scan_dir(path, exclude=()):
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+
+    files = []
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in exclude:
+                    subdirs.append(entry.path)
+            elif entry.is_file():
+                files.append(entry)
+        except OSError:
+            continue
+    return files, subdirs
+
+
+def walk_entries(path, exclude=()):
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            files, subdirs = scan_dir(current, exclude)
+        except OSError:
+            continue
+        yield from files
+        stack.extend(reversed(subdirs))
+
+
+def walk_files(path, exclude=()):
+    for entry in walk_entries(path, exclude):
+        yield entry.path
+
+
+CHUNK_SIZE = 64 * 1024
+WRITE_BATCH = 1024
+WRITE_INTERVAL = 0.1
+
+
+def write_lines(lines, stream=None):
+    stream = stream or sys.stdout
+    batch = []
+    written = time.monotonic()
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= WRITE_BATCH or time.monotonic() - written >= WRITE_INTERVAL:
+            stream.write("\n".join(batch) + "\n")
+            stream.flush()
+            batch = []
+            written = time.monotonic()
+    if batch:
+        stream.write("\n".join(batch) + "\n")
+
+
+def copy_stream(src, dst, chunk_size=CHUNK_SIZE):
+    last = b""
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return last
+        dst.write(chunk)
+        last = chunk[-1:]
+
+
+def line_chunks(f, chunk_size=CHUNK_SIZE):
+    line_start = True
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        pos = 0
+        while pos < len(chunk):
+            end = chunk.find(b"\n", pos) + 1 or len(chunk)
+            yield chunk[pos:end], line_start
+            line_start = chunk[end - 1] == 0x0A
+            pos = end
+
+
+def tail_offset(f, lines, chunk_size=CHUNK_SIZE):
+    end = f.seek(0, os.SEEK_END)
+    if lines <= 0 or end == 0:
+        return end
+
+    pos = end
+    newlines = 0
+    f.seek(end - 1)
+    if f.read(1) == b"\n":
+        newlines = -1
+
+    while pos > 0:
+        read_size = min(chunk_size, pos)
+        pos -= read_size
+        f.seek(pos)
+        chunk = f.read(read_size)
+        idx = len(chunk)
+        while True:
+            idx = chunk.rfind(b"\n", 0, idx)
+            if idx < 0:
+                break
+            newlines += 1
+            if newlines == lines:
+                return pos + idx + 1
+    return 0
+
+
+MIB = 1024 * 1024
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(value):
+    value = value.strip().upper().rstrip("B")
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size):
+    for unit in ("T", "G", "M", "K"):
+        if size >= SIZE_UNITS[unit]:
+            return f"{size / SIZE_UNITS[unit]:.1f}{unit}"
+    return str(size)
+
+
+class ProgressReporter:
+
+    def __init__(self, label, interval=0.5, unit=None):
+        self.label = label
+        self.interval = interval
+        self.unit = unit
+        self.start = time.perf_counter()
+        self.shown = 0
+        self.visible = False
+        self.enabled = sys.stdout.isatty()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def update(self, done, fraction=None, extra=""):
+        now = time.perf_counter()
+        if not self.enabled or now - self.shown < self.interval:
+            return
+        self.shown = now
+
+        elapsed = now - self.start
+        if self.unit:
+            parts = [f"{self.label}: {done} {self.unit}"]
+            rate = f"{done / max(elapsed, 1e-9):.0f} {self.unit}/s"
+        else:
+            parts = [f"{self.label}: {done / MIB:.1f} MiB"]
+            rate = f"{done / max(elapsed, 1e-9) / MIB:.1f} MiB/s"
+        if extra:
+            parts.append(extra)
+        parts.append(rate)
+        if fraction:
+            parts.append(f"{min(fraction, 1) * 100:.0f}%")
+            if fraction < 1:
+                parts.append(f"ETA {elapsed * (1 - fraction) / fraction:.0f} s")
+
+        sys.stdout.write("\r" + ", ".join(parts) + "\033[K")
+        sys.stdout.flush()
+        self.visible = True
+
+    def finish(self):
+        if self.visible:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+            self.visible = False
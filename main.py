@@ -1,11 +1,88 @@
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from core import utils
 from core.shell import MiniShell
+from core.trash_store import DEFAULT_MAX_AGE, DEFAULT_QUOTA
+
+STARTUP_PROBE = """
+import time
+started = time.perf_counter()
+from core.shell import MiniShell
+imported = time.perf_counter()
+MiniShell()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def profile_startup(limit=20):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.abspath(__file__))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory(prefix="minishell-profile-") as sandbox:
+        env["HOME"] = sandbox
+        env["XDG_DATA_HOME"] = os.path.join(sandbox, "data")
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_PROBE],
+                                capture_output=True, text=True, env=env, cwd=sandbox)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return
+
+    modules = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        modules.append((int(parts[0].split(":")[1]), int(parts[1]), parts[2].strip()))
+
+    import_time, init_time = (float(value) for value in result.stdout.split()[-2:])
+    print(f"Startup: {(import_time + init_time) * 1000:.1f} ms "
+          f"(imports {import_time * 1000:.1f} ms, MiniShell() {init_time * 1000:.1f} ms, "
+          f"{len(modules)} modules imported)")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:limit]:
+        print(f"{self_us / 1000:9.2f} {cumulative_us / 1000:9.2f}  {name}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Mini shell")
+    parser.add_argument("script", nargs="?",
+                        help="run commands from a script file in batch mode ('-' reads stdin)")
+    parser.add_argument("-c", dest="command",
+                        help="run the given commands (separated by ';') in batch mode")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a breakdown of shell startup and import times, then exit")
+    parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="format of shell.log entries")
+    parser.add_argument("--history-limit", type=int, default=10000,
+                        help="number of commands kept in .history")
+    parser.add_argument("--trash-max-age", type=float, default=DEFAULT_MAX_AGE / 86400,
+                        help="days after which trashed items are purged (0 keeps them forever)")
+    parser.add_argument("--trash-quota", type=utils.parse_size, default=DEFAULT_QUOTA,
+                        help="total size of trash before the oldest items are purged (0 - no limit)")
+    options = parser.parse_args()
+
+    if options.profile_startup:
+        profile_startup()
+        return
+
+    batch = options.command is not None or options.script is not None
+    shell = MiniShell(log_format=options.log_format, history_limit=options.history_limit,
+                      trash_max_age=options.trash_max_age * 86400, trash_quota=options.trash_quota,
+                      batch=batch)
 
-    shell = MiniShell()
-    shell.run()
+    if options.command is not None:
+        shell.run_script(options.command)
+    elif options.script == "-":
+        shell.run_script(sys.stdin.read())
+    elif options.script is not None:
+        with open(options.script, 'r', encoding='utf-8') as f:
+            shell.run_script(f.read())
+    else:
+        shell.run()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
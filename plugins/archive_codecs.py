@@ -0,0 +1,128 @@
+import os
+import bz2
+import time
+import gzip
+import lzma
+import shutil
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+ZIP_MAGICS = (b"PK\003\004", b"PK\005\006")
+TAR_MAGIC_OFFSET = 257
+MAGIC_SIZE = 6
+
+
+class Codec:
+
+    def __init__(self, name, label, extensions, magic, writer, reader, missing=None):
+        self.name = name
+        self.label = label
+        self.extensions = extensions
+        self.magic = magic
+        self.writer = writer
+        self.reader = reader
+        self.missing = missing
+        self.available = missing is None
+
+    def open_writer(self, fileobj, level=6, workers=None):
+        if not self.available:
+            raise ValueError(f"{self.label} support requires the {self.missing} module")
+        return self.writer(fileobj, level, workers)
+
+    def open_reader(self, fileobj):
+        if not self.available:
+            raise ValueError(f"{self.label} support requires the {self.missing} module")
+        return self.reader(fileobj)
+
+
+def zstd_writer(fileobj, level, workers):
+    compressor = zstandard.ZstdCompressor(level=level, threads=workers or 0)
+    return compressor.stream_writer(fileobj, closefd=False)
+
+
+def zstd_reader(fileobj):
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+
+
+CODECS = [
+    Codec("gzip", "TAR.GZ", (".tar.gz", ".tgz"), b"\x1f\x8b",
+          lambda f, level, workers: gzip.GzipFile(fileobj=f, mode='wb', compresslevel=level, mtime=0),
+          lambda f: gzip.GzipFile(fileobj=f, mode='rb')),
+    Codec("bzip2", "TAR.BZ2", (".tar.bz2", ".tbz2"), b"BZh",
+          lambda f, level, workers: bz2.BZ2File(f, 'wb', compresslevel=max(level, 1)),
+          lambda f: bz2.BZ2File(f, 'rb')),
+    Codec("xz", "TAR.XZ", (".tar.xz", ".txz"), b"\xfd7zXZ\x00",
+          lambda f, level, workers: lzma.LZMAFile(f, 'wb', preset=level),
+          lambda f: lzma.LZMAFile(f, 'rb')),
+    Codec("zstd", "TAR.ZST", (".tar.zst", ".tzst"), b"\x28\xb5\x2f\xfd",
+          zstd_writer, zstd_reader, missing="zstandard" if zstandard is None else None),
+    Codec("lz4", "TAR.LZ4", (".tar.lz4",), b"\x04\x22\x4d\x18",
+          lambda f, level, workers: lz4_frame.LZ4FrameFile(f, 'wb', compression_level=level),
+          lambda f: lz4_frame.LZ4FrameFile(f, 'rb'), missing="lz4" if lz4_frame is None else None),
+]
+
+PLAIN_TAR = Codec("tar", "TAR", (".tar",), b"",
+                  lambda f, level, workers: f, lambda f: f)
+
+
+def codec_for_path(path):
+    for codec in CODECS + [PLAIN_TAR]:
+        if path.endswith(codec.extensions):
+            return codec
+    return None
+
+
+def detect_format(path):
+    with open(path, 'rb') as f:
+        head = f.read(TAR_MAGIC_OFFSET + MAGIC_SIZE)
+
+    if head.startswith(ZIP_MAGICS):
+        return "zip"
+    for codec in CODECS:
+        if head.startswith(codec.magic):
+            return codec
+    if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + 5] == b"ustar":
+        return PLAIN_TAR
+    return None
+
+
+def benchmark(source, level=6, chunk_size=1024 * 1024):
+    size = os.path.getsize(source)
+    for codec in CODECS:
+        if not codec.available:
+            yield codec, None
+            continue
+
+        target = f"{source}.{codec.name}"
+        try:
+            start = time.perf_counter()
+            with open(source, 'rb') as src, open(target, 'wb') as raw:
+                with codec.open_writer(raw, level) as stream:
+                    shutil.copyfileobj(src, stream, chunk_size)
+            compress_time = time.perf_counter() - start
+            compressed = os.path.getsize(target)
+
+            start = time.perf_counter()
+            with open(target, 'rb') as raw, codec.open_reader(raw) as stream:
+                while stream.read(chunk_size):
+                    pass
+            decompress_time = time.perf_counter() - start
+        finally:
+            if os.path.exists(target):
+                os.remove(target)
+
+        yield codec, {
+            'size': size,
+            'compressed': compressed,
+            'ratio': size / max(compressed, 1),
+            'compress_speed': size / max(compress_time, 1e-9),
+            'decompress_speed': size / max(decompress_time, 1e-9),
+        }
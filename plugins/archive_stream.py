@@ -0,0 +1,177 @@
+import os
+import gzip
+import contextlib
+import fnmatch
+import tarfile
+from core import utils
+
+DEFAULT_MAX_TOTAL = 32 * 1024 ** 3
+DEFAULT_MAX_RATIO = 1000
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+def selected(name, patterns):
+    return not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def safe_target(dest, name):
+    target = os.path.normpath(os.path.join(dest, name))
+    if os.path.isabs(name) or os.path.commonpath([dest, target]) != dest:
+        raise ValueError(f"Unsafe member path: {name}")
+    return target
+
+
+def check_member(dest, member):
+    if member.isdev():
+        raise ValueError(f"Refusing to extract special file: {member.name}")
+    if not member.issym() and not member.islnk():
+        return
+    if os.path.isabs(member.linkname):
+        raise ValueError(f"Unsafe link target: {member.name} -> {member.linkname}")
+    base = os.path.dirname(os.path.join(dest, member.name)) if member.issym() else dest
+    target = os.path.normpath(os.path.join(base, member.linkname))
+    if os.path.commonpath([dest, target]) != dest:
+        raise ValueError(f"Unsafe link target: {member.name} -> {member.linkname}")
+
+
+def track_created(dest, target, created):
+    if created is None:
+        return
+    top = os.path.join(dest, os.path.relpath(target, dest).split(os.sep)[0])
+    if top in created:
+        return
+    if not os.path.lexists(top):
+        created[top] = True
+    elif not os.path.lexists(target):
+        created[target] = True
+
+
+class ExtractGuard:
+
+    def __init__(self, max_total, max_ratio):
+        self.max_total = max_total
+        self.max_ratio = max_ratio
+        self.total = 0
+
+    def reserve(self, name, size, compress_size=None):
+        if self.max_total and self.total + size > self.max_total:
+            raise ValueError(f"Refusing to extract {name}: total size would exceed {self.max_total} bytes")
+        if (self.max_ratio and compress_size is not None and size > RATIO_CHECK_MIN_SIZE
+                and size > max(compress_size, 1) * self.max_ratio):
+            raise ValueError(f"Refusing to extract {name}: compression ratio exceeds {self.max_ratio}")
+
+    def written(self, name, count, uncompressed, compressed):
+        self.total += count
+        if self.max_total and self.total > self.max_total:
+            raise ValueError(f"Extraction stopped at {name}: total size exceeds {self.max_total} bytes")
+        if self.max_ratio and uncompressed > RATIO_CHECK_MIN_SIZE and uncompressed > compressed * self.max_ratio:
+            raise ValueError(f"Extraction stopped at {name}: compression ratio exceeds {self.max_ratio}")
+
+
+def stream_member(src, target, name, guard, progress, measure, declared_size=None):
+    written = 0
+    out = open(target, 'wb')
+    try:
+        with out:
+            while True:
+                chunk = src.read(utils.CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+                written += len(chunk)
+                if declared_size is not None and written > declared_size:
+                    raise ValueError(f"Extraction stopped at {name}: member is larger than declared")
+                guard.written(name, len(chunk), *measure(written))
+                progress(len(chunk))
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(target)
+        raise
+    return written
+
+
+def extract_zip(zipf, dest, patterns=(), max_total=DEFAULT_MAX_TOTAL, max_ratio=DEFAULT_MAX_RATIO, progress=None,
+                created=None, cancel=None):
+    dest = os.path.abspath(dest)
+    members = [info for info in zipf.infolist() if selected(info.filename, patterns)]
+    total = sum(info.file_size for info in members)
+    guard = ExtractGuard(max_total, max_ratio)
+    guard.reserve(os.path.basename(zipf.filename or "archive"), total)
+    for info in members:
+        guard.reserve(info.filename, info.file_size, info.compress_size)
+    done = 0
+
+    def report(count):
+        nonlocal done
+        done += count
+        if progress:
+            progress.update(done, done / total if total else 1)
+
+    for info in members:
+        utils.check_cancelled(cancel)
+        target = safe_target(dest, info.filename)
+        track_created(dest, target, created)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+            continue
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with zipf.open(info) as src:
+            stream_member(src, target, info.filename, guard, report,
+                          lambda written: (written, max(info.compress_size, 1)), info.file_size)
+
+    return len(members), done
+
+
+def extract_tar(archive, dest, patterns=(), max_total=DEFAULT_MAX_TOTAL, max_ratio=DEFAULT_MAX_RATIO,
+                progress=None, reader=None, created=None, cancel=None):
+    dest = os.path.abspath(dest)
+    archive_size = max(os.path.getsize(archive), 1)
+    guard = ExtractGuard(max_total, max_ratio)
+    count = 0
+    done = 0
+
+    reader = reader or (lambda f: gzip.GzipFile(fileobj=f, mode='rb'))
+
+    with open(archive, 'rb') as raw, reader(raw) as stream, tarfile.open(fileobj=stream, mode='r|') as tarf:
+
+        def report(size):
+            nonlocal done
+            done += size
+            if progress:
+                progress.update(done, raw.tell() / archive_size)
+
+        for member in tarf:
+            utils.check_cancelled(cancel)
+            if not selected(member.name, patterns):
+                continue
+
+            track_created(dest, safe_target(dest, member.name), created)
+            if hasattr(tarfile, 'data_filter'):
+                member = tarfile.data_filter(member, dest)
+            else:
+                check_member(dest, member)
+
+            if not member.isfile():
+                if hasattr(tarfile, 'data_filter'):
+                    tarf.extract(member, dest, filter='fully_trusted')
+                else:
+                    tarf.extract(member, dest)
+                count += 1
+                continue
+
+            guard.reserve(member.name, member.size)
+            target = safe_target(dest, member.name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            src = tarf.extractfile(member)
+            stream_member(src, target, member.name, guard, report, lambda written: (guard.total, raw.tell()))
+            os.chmod(target, member.mode & 0o777)
+            os.utime(target, (member.mtime, member.mtime))
+            count += 1
+
+    return count, done
+
+
+def create_tar(archive, folder, writer, member_filter=None):
+    with open(archive, 'wb') as raw, writer(raw) as stream, tarfile.open(fileobj=stream, mode='w|') as tarf:
+        tarf.add(folder, arcname=os.path.basename(folder), filter=member_filter)
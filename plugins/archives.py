@@ -1,7 +1,11 @@
 import os
 import zipfile
-import tarfile
+import contextlib
+import tempfile
 from core import utils
+from plugins import archive_codecs
+from plugins import archive_stream
+from plugins import parallel_archive
 
 
 class ArchivesPlugin:
@@ -9,31 +13,85 @@ class ArchivesPlugin:
     def __init__(self, shell):
         self.shell = shell
 
+    def parse_compress_args(self, args):
+        try:
+            positional, options = utils.split_args(args, value_options=("-j", "--level"))
+            workers = int(options["-j"]) if "-j" in options else None
+            level = int(options.get("--level", 6))
+            if (workers is not None and workers < 1) or not 0 <= level <= 9:
+                raise ValueError
+        except ValueError:
+            return None
+        return positional, workers, level
+
+    def parse_extract_args(self, args):
+        try:
+            positional, options = utils.split_args(args, value_options=("--max-size", "--max-ratio"))
+            max_total = utils.parse_size(options.get("--max-size", str(archive_stream.DEFAULT_MAX_TOTAL)))
+            max_ratio = float(options.get("--max-ratio", archive_stream.DEFAULT_MAX_RATIO))
+            if max_total < 0 or max_ratio < 0:
+                raise ValueError
+        except ValueError:
+            return None
+        return positional, max_total, max_ratio
+
+    def creation_progress(self, label, folder):
+        progress = utils.ProgressReporter(label)
+        cancel = self.shell.cancellation()
+        total = 0
+        for entry in utils.walk_entries(folder):
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                continue
+        done = 0
+
+        def report(size):
+            nonlocal done
+            utils.check_cancelled(cancel)
+            done += size
+            progress.update(done, done / total if total else 1)
+
+        return progress, report
+
     def zip_cmd(self, args):
-        if len(args) < 2:
-            print("ERROR: Usage: zip <folder> <archive.zip>")
-            utils.log_command(self.shell.log_file, "zip", False, "Incorrect number of arguments")
+        parsed = self.parse_compress_args(args)
+        if parsed is None or len(parsed[0]) < 2:
+            print("ERROR: Usage: zip <folder> <archive.zip> [-j N] [--level 0-9]")
+            utils.log_command(self.shell.log_file, f"zip {' '.join(args)}".strip(), False, "Incorrect arguments")
             return
 
-        folder = utils.parse_path(self.shell.current_dir, args[0])
-        archive = utils.parse_path(self.shell.current_dir, args[1])
+        positional, workers, level = parsed
+        folder = utils.parse_path(self.shell.current_dir, positional[0])
+        archive = utils.parse_path(self.shell.current_dir, positional[1])
 
         if not archive.endswith('.zip'):
             archive += '.zip'
 
         try:
-            if not os.path.exists(folder) or not os.path.isdir(folder):
+            if not self.shell.stat_cache.isdir(folder):
                 error_msg = f"No such directory: {folder}"
                 print(f"ERROR: {error_msg}")
                 utils.log_command(self.shell.log_file, f"zip {' '.join(args)}", False, error_msg)
                 return
 
-            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(folder):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, os.path.dirname(folder))
-                        zipf.write(file_path, arcname)
+            progress, report = self.creation_progress("zip", folder)
+            members = ((file_path, os.path.relpath(file_path, os.path.dirname(folder)))
+                       for file_path in utils.walk_files(folder))
+            try:
+                if workers:
+                    parallel_archive.write_parallel_zip(archive, members, workers, level, report)
+                else:
+                    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+                        for file_path, arcname in members:
+                            zipf.write(file_path, arcname)
+                            report(zipf.getinfo(arcname.replace(os.sep, "/")).file_size)
+            except utils.Cancelled:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(archive)
+                raise
+            finally:
+                progress.finish()
 
             print(f"Created ZIP archive: {archive}")
             utils.log_command(self.shell.log_file, f"zip {' '.join(args)}", True)
@@ -44,83 +102,167 @@ class ArchivesPlugin:
             utils.log_command(self.shell.log_file, f"zip {' '.join(args)}", False, error_msg)
 
     def unzip(self, args):
-        if len(args) < 1:
-            print("ERROR: Usage: unzip <archive.zip>")
-            utils.log_command(self.shell.log_file, "unzip", False, "Incorrect number of arguments")
+        self.extract("unzip", args)
+
+    def tar(self, args):
+        parsed = self.parse_compress_args(args)
+        if parsed is None or len(parsed[0]) < 2:
+            print("ERROR: Usage: tar <folder> <archive.tar[.gz|.bz2|.xz|.zst|.lz4]> [-j N] [--level 0-9]")
+            utils.log_command(self.shell.log_file, f"tar {' '.join(args)}".strip(), False, "Incorrect arguments")
             return
 
-        archive = utils.parse_path(self.shell.current_dir, args[0])
+        positional, workers, level = parsed
+        folder = utils.parse_path(self.shell.current_dir, positional[0])
+        archive = utils.parse_path(self.shell.current_dir, positional[1])
+
+        codec = archive_codecs.codec_for_path(archive)
+        if codec is None:
+            archive += '.tar.gz'
+            codec = archive_codecs.codec_for_path(archive)
 
         try:
-            if not os.path.exists(archive):
-                error_msg = f"No such file: {archive}"
+            if not self.shell.stat_cache.isdir(folder):
+                error_msg = f"No such directory: {folder}"
+                print(f"ERROR: {error_msg}")
+                utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
+                return
+
+            if not codec.available:
+                error_msg = f"{codec.label} support requires the {codec.missing} module"
+                print(f"ERROR: {error_msg}")
+                utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
+                return
+
+            if workers and codec.name not in ("gzip", "zstd"):
+                error_msg = f"Parallel mode is not supported for {codec.label}"
                 print(f"ERROR: {error_msg}")
-                utils.log_command(self.shell.log_file, f"unzip {' '.join(args)}", False, error_msg)
+                utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
                 return
 
-            with zipfile.ZipFile(archive, 'r') as zipf:
-                zipf.extractall(self.shell.current_dir)
+            progress, report = self.creation_progress("tar", folder)
+
+            def member_filter(tarinfo):
+                report(tarinfo.size)
+                return tarinfo
 
-            print(f"Extracted ZIP archive: {archive}")
-            utils.log_command(self.shell.log_file, f"unzip {' '.join(args)}", True)
+            try:
+                if workers and codec.name == "gzip":
+                    parallel_archive.write_parallel_tar(archive, folder, workers, level, member_filter)
+                else:
+                    archive_stream.create_tar(archive, folder, lambda raw: codec.open_writer(raw, level, workers),
+                                              member_filter)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(archive)
+                raise
+            finally:
+                progress.finish()
+
+            print(f"Created {codec.label} archive: {archive}")
+            utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"unzip {' '.join(args)}", False, error_msg)
+            utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
 
-    def tar(self, args):
-        if len(args) < 2:
-            print("ERROR: Usage: tar <folder> <archive.tar.gz>")
-            utils.log_command(self.shell.log_file, "tar", False, "Incorrect number of arguments")
-            return
+    def untar(self, args):
+        self.extract("untar", args)
 
-        folder = utils.parse_path(self.shell.current_dir, args[0])
-        archive = utils.parse_path(self.shell.current_dir, args[1])
+    def extract(self, name, args):
+        parsed = self.parse_extract_args(args)
+        if parsed is None or len(parsed[0]) < 1:
+            print(f"ERROR: Usage: {name} <archive> [glob ...] [--max-size SIZE] [--max-ratio N]")
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}".strip(), False, "Incorrect arguments")
+            return
 
-        if not archive.endswith('.tar.gz'):
-            archive += '.tar.gz'
+        positional, max_total, max_ratio = parsed
+        archive = utils.parse_path(self.shell.current_dir, positional[0])
 
         try:
-            if not os.path.exists(folder) or not os.path.isdir(folder):
-                error_msg = f"No such directory: {folder}"
+            if not self.shell.stat_cache.exists(archive):
+                error_msg = f"No such file: {archive}"
                 print(f"ERROR: {error_msg}")
-                utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
+                utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}", False, error_msg)
                 return
 
-            with tarfile.open(archive, 'w:gz') as tarf:
-                tarf.add(folder, arcname=os.path.basename(folder))
+            archive_format = archive_codecs.detect_format(archive)
+            if archive_format is None:
+                error_msg = f"Unknown archive format: {archive}"
+                print(f"ERROR: {error_msg}")
+                utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}", False, error_msg)
+                return
 
-            print(f"Created TAR.GZ archive: {archive}")
-            utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", True)
+            progress = utils.ProgressReporter(name)
+            created = {}
+            try:
+                if archive_format == "zip":
+                    label = "ZIP"
+                    with zipfile.ZipFile(archive, 'r') as zipf:
+                        count, size = archive_stream.extract_zip(zipf, self.shell.current_dir, positional[1:],
+                                                                 max_total, max_ratio, progress, created,
+                                                                 self.shell.cancellation())
+                else:
+                    label = archive_format.label
+                    count, size = archive_stream.extract_tar(archive, self.shell.current_dir, positional[1:],
+                                                             max_total, max_ratio, progress,
+                                                             archive_format.open_reader, created,
+                                                             self.shell.cancellation())
+            finally:
+                progress.finish()
+                if created:
+                    self.shell.journal.record(name, f"{name} {' '.join(args)}", {'paths': list(created)})
+
+            print(f"Extracted {label} archive: {archive} ({count} members, {size} bytes in {progress.elapsed():.2f} s)")
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}", True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"tar {' '.join(args)}", False, error_msg)
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}", False, error_msg)
 
-    def untar(self, args):
-        if len(args) < 1:
-            print("ERROR: Usage: untar <archive.tar.gz>")
-            utils.log_command(self.shell.log_file, "untar", False, "Incorrect number of arguments")
-            return
+    def codecs_cmd(self, args):
+        try:
+            positional, options = utils.split_args(args, value_options=("--level",))
+            level = int(options.get("--level", 6))
+        except ValueError:
+            positional, level = [], None
 
-        archive = utils.parse_path(self.shell.current_dir, args[0])
+        if level is None or (positional and (positional[0] != "bench" or len(positional) < 2)):
+            print("ERROR: Usage: codecs [bench <folder> [--level N]]")
+            utils.log_command(self.shell.log_file, f"codecs {' '.join(args)}".strip(), False, "Incorrect arguments")
+            return
 
         try:
-            if not os.path.exists(archive):
-                error_msg = f"No such file: {archive}"
+            if not positional:
+                for codec in archive_codecs.CODECS:
+                    status = "available" if codec.available else f"needs {codec.missing}"
+                    print(f"{codec.name:6} {', '.join(codec.extensions):20} {status}")
+                utils.log_command(self.shell.log_file, f"codecs {' '.join(args)}".strip(), True)
+                return
+
+            folder = utils.parse_path(self.shell.current_dir, positional[1])
+            if not self.shell.stat_cache.isdir(folder):
+                error_msg = f"No such directory: {folder}"
                 print(f"ERROR: {error_msg}")
-                utils.log_command(self.shell.log_file, f"untar {' '.join(args)}", False, error_msg)
+                utils.log_command(self.shell.log_file, f"codecs {' '.join(args)}", False, error_msg)
                 return
 
-            with tarfile.open(archive, 'r:gz') as tarf:
-                tarf.extractall(self.shell.current_dir)
+            with tempfile.TemporaryDirectory(prefix="codecs_bench_") as tmp_dir:
+                source = os.path.join(tmp_dir, "bench.tar")
+                archive_stream.create_tar(source, folder, lambda raw: raw)
+                print(f"{'codec':6} {'size':>12} {'ratio':>7} {'compress':>12} {'decompress':>12}")
+                for codec, result in archive_codecs.benchmark(source, level):
+                    if result is None:
+                        print(f"{codec.name:6} skipped (needs {codec.missing})")
+                        continue
+                    print(f"{codec.name:6} {result['compressed']:12} {result['ratio']:7.2f} "
+                          f"{result['compress_speed'] / utils.MIB:8.1f} MiB/s "
+                          f"{result['decompress_speed'] / utils.MIB:8.1f} MiB/s")
 
-            print(f"Extracted TAR.GZ archive: {archive}")
-            utils.log_command(self.shell.log_file, f"untar {' '.join(args)}", True)
+            utils.log_command(self.shell.log_file, f"codecs {' '.join(args)}", True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"untar {' '.join(args)}", False, error_msg)
\ No newline at end of file
+            utils.log_command(self.shell.log_file, f"codecs {' '.join(args)}", False, error_msg)
@@ -0,0 +1,113 @@
+import os
+from core import utils
+from plugins import disk_scan
+
+
+class DiskPlugin:
+
+    def __init__(self, shell):
+        self.shell = shell
+
+    def du_cmd(self, args):
+        try:
+            utils.write_lines(self.du_lines(args))
+            utils.log_command(self.shell.log_file, f"du {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"du {' '.join(args)}".strip(), False, error_msg)
+
+    def du_lines(self, args, upstream=None):
+        usage = "Usage: du [path] [-d N] [-s] [-h] [-j N] [--cache]"
+
+        try:
+            positional, options = utils.split_args(args, value_options=("-d", "-j"),
+                                                  flags=("-s", "-h", "--cache"))
+            max_depth = 0 if "-s" in options else int(options.get("-d", 1))
+            workers = int(options.get("-j", disk_scan.DEFAULT_WORKERS))
+            if max_depth < 0 or workers < 1 or len(positional) > 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError(usage) from None
+
+        root = os.path.normpath(utils.parse_path(self.shell.current_dir, positional[0]) if positional
+                                else self.shell.current_dir)
+        if not self.shell.stat_cache.isdir(root):
+            raise NotADirectoryError(f"No such directory: {root}")
+
+        use_cache = "--cache" in options
+        cache_file = disk_scan.cache_file_for(self.shell.index_dir, root)
+        cache = disk_scan.load_cache(cache_file) if use_cache else None
+
+        progress = utils.ProgressReporter("du", unit="files")
+
+        def report(dirs, files, elapsed):
+            progress.update(files, None, f"{dirs} directories")
+
+        try:
+            rows, stats, fresh = disk_scan.disk_usage(root, max_depth, workers, cache, report,
+                                                      self.shell.cancellation())
+        finally:
+            progress.finish()
+        if use_cache:
+            disk_scan.save_cache(cache_file, fresh)
+
+        human = "-h" in options
+        for path, size, count in rows:
+            yield f"{utils.format_size(size) if human else size}\t{path}"
+
+        summary = (f"{stats['files']} files in {stats['dirs']} directories, "
+                   f"{stats['elapsed']:.2f} s")
+        if use_cache:
+            summary += f", {stats['cached']} directories from cache"
+        if stats['errors']:
+            summary += f", {stats['errors']} directories unreadable"
+        yield summary
+
+    def dupes_cmd(self, args):
+        try:
+            utils.write_lines(self.dupes_lines(args))
+            utils.log_command(self.shell.log_file, f"dupes {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"dupes {' '.join(args)}".strip(), False, error_msg)
+
+    def dupes_lines(self, args, upstream=None):
+        usage = "Usage: dupes [path] [-j N] [--min-size SIZE]"
+
+        try:
+            positional, options = utils.split_args(args, value_options=("-j", "--min-size"))
+            workers = int(options.get("-j", disk_scan.DEFAULT_WORKERS))
+            min_size = max(utils.parse_size(options.get("--min-size", "1")), 1)
+            if workers < 1 or len(positional) > 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError(usage) from None
+
+        root = os.path.normpath(utils.parse_path(self.shell.current_dir, positional[0]) if positional
+                                else self.shell.current_dir)
+        if not self.shell.stat_cache.isdir(root):
+            raise NotADirectoryError(f"No such directory: {root}")
+
+        progress = utils.ProgressReporter("dupes")
+        groups = 0
+        wasted = 0
+        try:
+            for size, paths in disk_scan.find_duplicates(root, workers, min_size, progress.update,
+                                                         self.shell.cancellation()):
+                progress.finish()
+                groups += 1
+                wasted += size * (len(paths) - 1)
+                yield f"{len(paths)} files x {size} bytes ({size * (len(paths) - 1)} bytes reclaimable):"
+                for path in paths:
+                    yield f"  {path}"
+        finally:
+            progress.finish()
+
+        if groups:
+            yield f"{groups} duplicate groups, {wasted} bytes reclaimable"
+        else:
+            yield "No duplicates found"
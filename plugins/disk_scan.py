@@ -0,0 +1,221 @@
+import os
+import time
+import json
+import hashlib
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from core import utils
+
+DEFAULT_WORKERS = 8
+CACHE_VERSION = 3
+CACHE_MIN_AGE_NS = 2 * 10 ** 9
+PREFIX_SIZE = 4096
+HASH_CHUNK = 1024 * 1024
+
+
+def cache_file_for(index_dir, root):
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(index_dir, f"{digest}.du")
+
+
+def load_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+
+    try:
+        return {dir_path: (int(mtime_ns), int(size), int(count), tuple(str(name) for name in names),
+                           tuple((int(dev), int(ino), int(link_size)) for dev, ino, link_size in links))
+                for dir_path, (mtime_ns, size, count, names, links) in data['dirs'].items()}
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return {}
+
+
+def save_cache(path, dirs):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'dirs': dirs}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def scan_directory(path, cache):
+    st = os.lstat(path)
+    cached = cache.get(path) if cache is not None else None
+    if cached is not None and cached[0] == st.st_mtime_ns:
+        return cached, True
+
+    files, subdirs = utils.scan_dir(path)
+    size = st.st_size
+    links = []
+    for entry in files:
+        try:
+            file_st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if file_st.st_nlink > 1:
+            links.append((file_st.st_dev, file_st.st_ino, file_st.st_size))
+        else:
+            size += file_st.st_size
+    names = tuple(os.path.basename(subdir) for subdir in subdirs)
+    return (st.st_mtime_ns, size, len(files), names, tuple(links)), False
+
+
+def disk_usage(root, max_depth=None, workers=DEFAULT_WORKERS, cache=None, report=None, cancel=None):
+    start = time.perf_counter()
+    totals = {}
+    fresh = {} if cache is not None else None
+    stats = {'dirs': 0, 'files': 0, 'cached': 0, 'errors': 0}
+    linked = set()
+    queue = [(root, 0, root)]
+    pending = {}
+
+    def collect(done):
+        for future in done:
+            path, depth, bucket = pending.pop(future)
+            try:
+                record, hit = future.result()
+            except OSError:
+                stats['errors'] += 1
+                continue
+
+            mtime_ns, size, count, names, links = record
+            for dev, ino, link_size in links:
+                if (dev, ino) not in linked:
+                    linked.add((dev, ino))
+                    size += link_size
+            total = totals.setdefault(bucket, [0, 0])
+            total[0] += size
+            total[1] += count
+            stats['dirs'] += 1
+            stats['files'] += count
+            stats['cached'] += hit
+            if fresh is not None and (hit or time.time_ns() - mtime_ns > CACHE_MIN_AGE_NS):
+                fresh[path] = record
+
+            for name in names:
+                child = os.path.join(path, name)
+                child_bucket = child if max_depth is None or depth < max_depth else bucket
+                queue.append((child, depth + 1, child_bucket))
+        if report:
+            report(stats['dirs'], stats['files'], time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while queue or pending:
+            utils.check_cancelled(cancel)
+            while queue and len(pending) < workers * 4:
+                path, depth, bucket = queue.pop()
+                pending[executor.submit(scan_directory, path, cache)] = (path, depth, bucket)
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+
+    for path in sorted(totals, key=lambda path: path.count(os.sep), reverse=True):
+        if path != root:
+            parent = totals.setdefault(os.path.dirname(path), [0, 0])
+            parent[0] += totals[path][0]
+            parent[1] += totals[path][1]
+
+    stats['elapsed'] = time.perf_counter() - start
+    rows = [(path, size, count) for path, (size, count) in sorted(totals.items())]
+    return rows, stats, fresh
+
+
+def size_groups(root, min_size=1, cancel=None):
+    counts = {}
+    for entry in utils.walk_entries(root):
+        utils.check_cancelled(cancel)
+        try:
+            if entry.is_symlink():
+                continue
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        if size >= min_size:
+            counts[size] = counts.get(size, 0) + 1
+
+    groups = {}
+    for entry in utils.walk_entries(root):
+        utils.check_cancelled(cancel)
+        try:
+            if entry.is_symlink():
+                continue
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if counts.get(st.st_size, 0) > 1:
+            groups.setdefault(st.st_size, {}).setdefault((st.st_dev, entry.inode()), entry.path)
+
+    return {size: list(paths.values()) for size, paths in groups.items() if len(paths) > 1}
+
+
+def prefix_hash(item):
+    size, path = item
+    hasher = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            hasher.update(f.read(PREFIX_SIZE))
+    except OSError:
+        return None
+    return hasher
+
+
+def full_hash(item):
+    size, prefix, path, hasher = item
+    try:
+        if size > PREFIX_SIZE:
+            with open(path, 'rb') as f:
+                f.seek(PREFIX_SIZE)
+                while True:
+                    chunk = f.read(HASH_CHUNK)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+    except OSError:
+        return None
+    return hasher.digest()
+
+
+def find_duplicates(root, workers=DEFAULT_WORKERS, min_size=1, report=None, cancel=None):
+    groups = size_groups(root, min_size, cancel)
+    done_bytes = 0
+
+    def candidates():
+        for size in sorted(groups, reverse=True):
+            for path in groups.pop(size):
+                utils.check_cancelled(cancel)
+                yield size, path
+
+    def prefix_groups(prefixed):
+        nonlocal done_bytes
+        for size, results in itertools.groupby(prefixed, key=lambda result: result[0][0]):
+            by_prefix = {}
+            for (_, path), hasher in results:
+                done_bytes += min(size, PREFIX_SIZE)
+                if hasher is not None:
+                    by_prefix.setdefault(hasher.digest(), []).append((size, path, hasher))
+            for prefix, members in by_prefix.items():
+                if len(members) > 1:
+                    for _, path, hasher in members:
+                        yield size, prefix, path, hasher
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        prefixed = utils.ordered_map(executor, prefix_hash, candidates(), workers * 4)
+        hashed = utils.ordered_map(executor, full_hash, prefix_groups(prefixed), workers * 4)
+        for (size, _), results in itertools.groupby(hashed, key=lambda result: result[0][:2]):
+            utils.check_cancelled(cancel)
+            by_digest = {}
+            for (_, _, path, _), digest in results:
+                done_bytes += max(size - PREFIX_SIZE, 0)
+                if digest is not None:
+                    by_digest.setdefault(digest, []).append(path)
+            if report:
+                report(done_bytes)
+            for paths in by_digest.values():
+                if len(paths) > 1:
+                    yield size, sorted(paths)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,49 +1,59 @@
 import os
-import json
-import shutil
+import sys
+import codecs
 import datetime
+import itertools
+from collections import deque
 from core import utils
+from plugins.history_index import HistoryIndex
+from plugins.history_store import HistoryStore
+
+SEARCH_LIMIT = 20
 
 
 class HistoryPlugin:
 
     def __init__(self, shell):
         self.shell = shell
+        self.store = HistoryStore(self.shell.history_file, self.shell.history_limit)
+        self.index = HistoryIndex()
+        if not self.shell.batch:
+            self.load_history()
 
     def load_history(self):
-        if os.path.exists(self.shell.history_file):
-            try:
-                with open(self.shell.history_file, 'r') as f:
-                    self.shell.history = json.load(f)
-                    self.shell.command_count = len(self.shell.history)
-            except:
-                self.shell.history = []
+        try:
+            self.shell.history = self.store.load()
+        except (OSError, ValueError):
+            self.shell.history = deque(maxlen=self.shell.history_limit)
+        self.shell.command_count = self.shell.history[-1]['id'] if self.shell.history else 0
+
+        self.index = HistoryIndex()
+        for entry in self.shell.history:
+            self.index.add(entry)
 
     def save_history(self):
-        with open(self.shell.history_file, 'w') as f:
-            json.dump(self.shell.history, f)
+        self.store.compact(self.shell.history)
 
     def add_to_history(self, command):
-        self.shell.history.append({
-            'id': len(self.shell.history) + 1,
+        self.shell.command_count += 1
+        entry = {
+            'id': self.shell.command_count,
             'command': command,
             'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        if len(self.shell.history) > 100:
-            self.shell.history = self.shell.history[-100:]
-        self.save_history()
+        }
+        if len(self.shell.history) == self.shell.history.maxlen:
+            self.index.remove_oldest(self.shell.history[0])
+        self.shell.history.append(entry)
+        self.index.add(entry)
+        self.store.append(entry, self.shell.history)
 
     def history_cmd(self, args):
-        try:
-            n = 10
-            if args and args[0].isdigit():
-                n = int(args[0])
-                n = min(n, 100)
-
-            start_idx = max(0, len(self.shell.history) - n)
-            for i, entry in enumerate(self.shell.history[start_idx:], start=start_idx + 1):
-                print(f"{i}: [{entry['timestamp']}] {entry['command']}")
+        if args and args[0] == "search":
+            self.search_cmd(args[1:])
+            return
 
+        try:
+            utils.write_lines(self.history_lines(args))
             utils.log_command(self.shell.log_file, f"history {' '.join(args)}", True)
 
         except Exception as e:
@@ -51,41 +61,167 @@ class HistoryPlugin:
             print(f"ERROR: {error_msg}")
             utils.log_command(self.shell.log_file, f"history {' '.join(args)}", False, error_msg)
 
-    def undo(self, args):
+    def history_lines(self, args, upstream=None):
+        if args and args[0] == "search":
+            if len(args) < 2:
+                raise ValueError("Interactive search cannot be used in a pipeline")
+            for entry in self.index.search(" ".join(args[1:]), SEARCH_LIMIT):
+                yield f"{entry['id']}: [{entry['timestamp']}] {entry['command']}"
+            return
+
+        n = 10
+        if args and args[0].isdigit():
+            n = int(args[0])
+            n = min(n, self.shell.history_limit)
+
+        start_idx = max(0, len(self.shell.history) - n)
+        for i, entry in enumerate(itertools.islice(self.shell.history, start_idx, None), start=start_idx + 1):
+            yield f"{i}: [{entry['timestamp']}] {entry['command']}"
+
+    def search_cmd(self, args):
         try:
-            if not self.shell.last_command:
-                print("ERROR: No command to undo")
-                utils.log_command(self.shell.log_file, "undo", False, "No command to undo")
+            if not args:
+                command = self.reverse_search()
+                utils.log_command(self.shell.log_file, "history search", True)
+                if command:
+                    self.shell.execute_line(command)
                 return
 
-            if self.shell.last_command == 'cp':
-                if os.path.exists(self.shell.last_command_args['destination']):
-                    if os.path.isdir(self.shell.last_command_args['destination']):
-                        shutil.rmtree(self.shell.last_command_args['destination'])
-                    else:
-                        os.remove(self.shell.last_command_args['destination'])
-                    print(f"Undo cp: removed {self.shell.last_command_args['destination']}")
-
-            elif self.shell.last_command == 'mv':
-                if os.path.exists(self.shell.last_command_args['destination']):
-                    shutil.move(self.shell.last_command_args['destination'], self.shell.last_command_args['source'])
-                    print(f"Undo mv: moved back to {self.shell.last_command_args['source']}")
-
-            elif self.shell.last_command == 'rm':
-                if os.path.exists(self.shell.last_command_args['trash_item']):
-                    shutil.move(self.shell.last_command_args['trash_item'], self.shell.last_command_args['target'])
-                    print(f"Undo rm: restored {self.shell.last_command_args['target']}")
-
-            else:
-                print(f"ERROR: Cannot undo command: {self.shell.last_command}")
-                utils.log_command(self.shell.log_file, "undo", False, f"Cannot undo command: {self.shell.last_command}")
+            for entry in self.index.search(" ".join(args), SEARCH_LIMIT):
+                print(f"{entry['id']}: [{entry['timestamp']}] {entry['command']}")
+
+            utils.log_command(self.shell.log_file, f"history search {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"history search {' '.join(args)}", False, error_msg)
+
+    def reverse_search(self):
+        try:
+            import tty
+            import termios
+        except ImportError:
+            raise ValueError("Interactive search requires a terminal")
+
+        if not sys.stdin.isatty() or not self.shell.interactive():
+            raise ValueError("Interactive search requires a terminal")
+
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        query = ""
+        skip = 0
+        match = None
+
+        try:
+            tty.setcbreak(fd)
+            while True:
+                results = self.index.search(query, skip + 1) if query else []
+                match = results[skip]['command'] if len(results) > skip else None
+                status = "" if match or not query else "failing "
+                sys.stdout.write(f"\r\033[K({status}reverse-i-search)`{query}': {match or ''}")
+                sys.stdout.flush()
+
+                char = decoder.decode(os.read(fd, 1))
+                if char in ("\r", "\n"):
+                    break
+                if char in ("\x03", "\x07", "\x1b"):
+                    match = None
+                    break
+                if char == "\x12":
+                    skip += 1 if match else 0
+                elif char in ("\x7f", "\x08"):
+                    query = query[:-1]
+                    skip = 0
+                elif char and char.isprintable():
+                    query += char
+                    skip = 0
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+
+        return match
+
+    def undo(self, args):
+        self.replay("undo", args)
+
+    def redo(self, args):
+        self.replay("redo", args)
+
+    def replay(self, name, args):
+        try:
+            count = int(args[0]) if args else 1
+            if count < 1:
+                raise ValueError
+        except ValueError:
+            print(f"ERROR: Usage: {name} [N]")
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}", False, "Invalid arguments")
+            return
+
+        journal = self.shell.journal
+        try:
+            replayed = 0
+            while replayed < count:
+                step = journal.last_done() if name == "undo" else journal.last_undone()
+                if step is None:
+                    break
+
+                if name == "undo":
+                    self.undo_step(step)
+                    journal.mark_undone(step)
+                else:
+                    self.redo_step(step)
+                    journal.mark_redone(step)
+                print(f"{name.capitalize()} {step['line']}")
+                replayed += 1
+
+            if not replayed:
+                print(f"ERROR: No command to {name}")
+                utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}".strip(), False,
+                                  f"No command to {name}")
                 return
 
-            self.shell.last_command = None
-            self.shell.last_command_args = None
-            utils.log_command(self.shell.log_file, "undo", True)
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}".strip(), True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, "undo", False, error_msg)
\ No newline at end of file
+            utils.log_command(self.shell.log_file, f"{name} {' '.join(args)}".strip(), False, error_msg)
+
+    def undo_step(self, step):
+        args = step['args']
+        if step['command'] == 'mv':
+            self.move_back(args['destination'], args['source'])
+        elif step['command'] == 'rm':
+            self.shell.trash.restore(args['trash_item'], args['target'])
+        elif step['command'] in ('cp', 'unzip', 'untar'):
+            paths = [(i, path) for i, path in enumerate(args['paths']) if os.path.lexists(path)]
+            if not paths:
+                raise FileNotFoundError("Nothing left to undo: files were changed after the command")
+            for i, path in paths:
+                self.shell.trash.put(path, f"undo-{step['id']}-{i}-{os.path.basename(path)}")
+        else:
+            raise ValueError(f"Cannot undo command: {step['command']}")
+
+    def redo_step(self, step):
+        args = step['args']
+        if step['command'] == 'mv':
+            self.move_back(args['source'], args['destination'])
+        elif step['command'] == 'rm':
+            self.shell.trash.put(args['target'], os.path.basename(args['trash_item']))
+        else:
+            names = {f"undo-{step['id']}-{i}-{os.path.basename(path)}": path for i, path in enumerate(args['paths'])}
+            entries = [entry for entry in self.shell.trash.list() if os.path.basename(entry['item']) in names]
+            if not entries:
+                raise FileNotFoundError("Nothing left to redo: files were purged from trash")
+            for entry in entries:
+                self.shell.trash.restore(entry['item'], names[os.path.basename(entry['item'])])
+
+    def move_back(self, source, destination):
+        if not os.path.lexists(source):
+            raise FileNotFoundError(f"No such file or directory: {source}")
+        if os.path.lexists(destination):
+            raise FileExistsError(f"Refusing to overwrite {destination}")
+        utils.move_path(source, destination)
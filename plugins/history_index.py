@@ -0,0 +1,121 @@
+import re
+import itertools
+from collections import deque
+
+TOKEN_RE = re.compile(r"\w+")
+COUNT = 0
+TOKEN = None
+SCAN_STEPS = 500
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class HistoryIndex:
+
+    def __init__(self):
+        self.trie = {COUNT: 0}
+        self.postings = {}
+        self.entries = {}
+
+    def add(self, entry):
+        tokens = tuple(dict.fromkeys(tokenize(entry['command'])))
+        self.entries[entry['id']] = (entry, tokens)
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = deque()
+            posting.append(entry['id'])
+            self.trie_update(token, 1)
+
+    def remove_oldest(self, entry):
+        indexed = self.entries.pop(entry['id'], None)
+        if indexed is None:
+            return
+        for token in indexed[1]:
+            posting = self.postings[token]
+            if posting[0] == entry['id']:
+                posting.popleft()
+            else:
+                posting.remove(entry['id'])
+            if not posting:
+                del self.postings[token]
+            self.trie_update(token, -1)
+
+    def trie_update(self, token, delta):
+        node = self.trie
+        node[COUNT] += delta
+        for char in token:
+            child = node.get(char)
+            if child is None:
+                child = node[char] = {COUNT: 0}
+            child[COUNT] += delta
+            if child[COUNT] == 0:
+                del node[char]
+                return
+            node = child
+        if delta > 0:
+            node[TOKEN] = token
+        elif token not in self.postings:
+            node.pop(TOKEN, None)
+
+    def find_node(self, prefix):
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def tokens_under(self, node):
+        tokens = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is TOKEN:
+                    tokens.append(child)
+                elif key != COUNT:
+                    stack.append(child)
+        return tokens
+
+    def matches(self, tokens, query_tokens):
+        return all(any(token.startswith(q) for token in tokens) for q in query_tokens)
+
+    def ids_under(self, node):
+        postings = (self.postings[token] for token in self.tokens_under(node))
+        return set(itertools.chain.from_iterable(postings))
+
+    def search(self, query, limit=20):
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens or not self.entries:
+            return []
+
+        nodes = [self.find_node(q) for q in query_tokens]
+        if any(node is None for node in nodes):
+            return []
+        nodes.sort(key=lambda node: node[COUNT])
+
+        density = 1.0
+        for node in nodes:
+            density *= node[COUNT] / len(self.entries)
+
+        if density and limit / density <= SCAN_STEPS:
+            candidates = reversed(self.entries)
+        else:
+            ids = self.ids_under(nodes[0])
+            for node in nodes[1:]:
+                if len(ids) <= SCAN_STEPS:
+                    break
+                ids &= self.ids_under(node)
+            candidates = sorted(ids, reverse=True)
+
+        results = []
+        for entry_id in candidates:
+            entry, tokens = self.entries[entry_id]
+            if self.matches(tokens, query_tokens):
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,77 @@
+import os
+import json
+from collections import deque
+from core import utils
+
+
+class HistoryStore:
+
+    def __init__(self, path, limit=100):
+        self.path = os.path.abspath(path)
+        self.limit = limit
+        self.file = None
+        self.file_entries = 0
+        self.needs_newline = False
+
+    def load(self):
+        entries = deque(maxlen=self.limit)
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path, 'rb') as f:
+            legacy = f.read(1) == b"["
+            if legacy:
+                f.seek(0)
+                data = json.loads(f.read().decode('utf-8'))
+                for number, entry in enumerate(data[-self.limit:], 1):
+                    entry['id'] = number
+                    entries.append(entry)
+            else:
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    self.needs_newline = f.read(1) != b"\n"
+                f.seek(utils.tail_offset(f, self.limit))
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+
+        self.file_entries = len(entries)
+        if legacy:
+            self.compact(entries)
+        return entries
+
+    def append(self, entry, entries):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+            if self.needs_newline:
+                self.file.write("\n")
+                self.needs_newline = False
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.file_entries += 1
+
+        if self.file_entries >= self.limit * 2:
+            self.compact(entries)
+
+    def compact(self, entries):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.file_entries = len(entries)
+        self.needs_newline = False
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
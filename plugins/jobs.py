@@ -0,0 +1,75 @@
+from core import utils
+
+
+class JobsPlugin:
+
+    def __init__(self, shell):
+        self.shell = shell
+
+    def find_job(self, spec):
+        job = self.shell.jobs.find(spec)
+        if job is None:
+            raise ValueError(f"No such job: {spec}" if spec else "No current job")
+        return job
+
+    def jobs_cmd(self, args):
+        try:
+            jobs = sorted(self.shell.jobs.jobs.values(), key=lambda job: job.id)
+            if not jobs:
+                print("No jobs")
+            for job in jobs:
+                print(f"[{job.id}] {job.status:8} {job.running_time():8.2f} s  {job.command}")
+            utils.log_command(self.shell.log_file, f"jobs {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"jobs {' '.join(args)}".strip(), False, error_msg)
+
+    def fg_cmd(self, args):
+        try:
+            job = self.find_job(args[0] if args else None)
+            self.shell.jobs.wait(job)
+            for finished in self.shell.jobs.collect(job):
+                self.shell.jobs.report(finished)
+            utils.log_command(self.shell.log_file, f"fg {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"fg {' '.join(args)}".strip(), False, error_msg)
+
+    def wait_cmd(self, args):
+        try:
+            jobs = [self.find_job(spec) for spec in args] or self.shell.jobs.running()
+            for job in jobs:
+                self.shell.jobs.wait(job)
+            self.shell.jobs.report_finished()
+            utils.log_command(self.shell.log_file, f"wait {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"wait {' '.join(args)}".strip(), False, error_msg)
+
+    def kill_cmd(self, args):
+        if not args or not all(arg.startswith("%") for arg in args):
+            print("ERROR: Usage: kill %N [%N ...]")
+            utils.log_command(self.shell.log_file, f"kill {' '.join(args)}".strip(), False, "Incorrect arguments")
+            return
+
+        try:
+            for spec in args:
+                job = self.find_job(spec)
+                if self.shell.jobs.kill(job):
+                    print(f"[{job.id}] Killing  {job.command}")
+                    if not self.shell.jobs.interruptible(job):
+                        print(f"WARNING: {job.cmd} cannot be interrupted; job {job.id} will run to completion")
+                else:
+                    print(f"[{job.id}] Already {job.status.lower()}  {job.command}")
+            utils.log_command(self.shell.log_file, f"kill {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"kill {' '.join(args)}", False, error_msg)
@@ -0,0 +1,188 @@
+import os
+import gzip
+import zlib
+import time
+import struct
+import tarfile
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from core import utils
+
+BLOCK_SIZE = 1024 * 1024
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_DEFLATED = 8
+UTF8_FLAG = 0x800
+
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+END_RECORD64 = struct.Struct("<4sQ2H2L4Q")
+END_LOCATOR64 = struct.Struct("<4sLQL")
+
+
+def deflate_block(job, level):
+    data, final = job[1], job[2]
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def gzip_block(data, level):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipEntry:
+
+    def __init__(self, path, arcname, st):
+        self.path = path
+        self.name = arcname.replace(os.sep, "/").encode('utf-8')
+        self.flags = 0 if arcname.isascii() else UTF8_FLAG
+        self.mode = st.st_mode
+        self.time, self.date = dos_datetime(st.st_mtime)
+        self.zip64 = st.st_size * 1.05 > ZIP64_LIMIT
+        self.file_size = 0
+        self.compress_size = 0
+        self.crc = 0
+        self.offset = 0
+
+    def local_header(self):
+        if self.zip64:
+            extra = struct.pack("<2H2Q", 1, 16, self.file_size, self.compress_size)
+            sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+        else:
+            extra = b""
+            sizes = (self.compress_size, self.file_size)
+        version = 45 if self.zip64 else 20
+        return LOCAL_HEADER.pack(b"PK\003\004", version, 0, self.flags, ZIP_DEFLATED,
+                                 self.time, self.date, self.crc, *sizes,
+                                 len(self.name), len(extra)) + self.name + extra
+
+    def central_header(self):
+        values = []
+        file_size, compress_size, offset = self.file_size, self.compress_size, self.offset
+        if file_size > ZIP64_LIMIT:
+            values.append(file_size)
+            file_size = 0xFFFFFFFF
+        if compress_size > ZIP64_LIMIT:
+            values.append(compress_size)
+            compress_size = 0xFFFFFFFF
+        if offset > ZIP64_LIMIT:
+            values.append(offset)
+            offset = 0xFFFFFFFF
+        extra = struct.pack(f"<2H{len(values)}Q", 1, 8 * len(values), *values) if values else b""
+        version = 45 if values else 20
+        return CENTRAL_HEADER.pack(b"PK\001\002", version, 3, version, 0, self.flags, ZIP_DEFLATED,
+                                   self.time, self.date, self.crc, compress_size, file_size,
+                                   len(self.name), len(extra), 0, 0, 0,
+                                   (self.mode & 0xFFFF) << 16, offset) + self.name + extra
+
+
+def zip_jobs(files):
+    for path, arcname in files:
+        with open(path, 'rb') as f:
+            entry = ZipEntry(path, arcname, os.fstat(f.fileno()))
+            crc = 0
+            data = f.read(BLOCK_SIZE)
+            while True:
+                crc = zlib.crc32(data, crc)
+                following = f.read(BLOCK_SIZE)
+                entry.file_size += len(data)
+                final = not following
+                if final:
+                    entry.crc = crc
+                yield entry, data, final
+                if final:
+                    break
+                data = following
+
+
+def write_parallel_zip(archive, files, workers, level=6, progress=None):
+    entries = []
+    with open(archive, 'wb') as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        compress = partial(deflate_block, level=level)
+        current = None
+        for (entry, _, final), compressed in utils.ordered_map(executor, compress, zip_jobs(files), workers * 4):
+            if entry is not current:
+                current = entry
+                entry.offset = out.tell()
+                out.write(entry.local_header())
+            out.write(compressed)
+            entry.compress_size += len(compressed)
+            if final:
+                end = out.tell()
+                out.seek(entry.offset)
+                out.write(entry.local_header())
+                out.seek(end)
+                entries.append(entry)
+                if progress:
+                    progress(entry.file_size)
+
+        start_dir = out.tell()
+        for entry in entries:
+            out.write(entry.central_header())
+        end_dir = out.tell()
+        size_dir = end_dir - start_dir
+
+        if len(entries) > 0xFFFF or start_dir > ZIP64_LIMIT or size_dir > ZIP64_LIMIT:
+            out.write(END_RECORD64.pack(b"PK\006\006", 44, 45, 45, 0, 0,
+                                        len(entries), len(entries), size_dir, start_dir))
+            out.write(END_LOCATOR64.pack(b"PK\006\007", 0, end_dir, 1))
+            out.write(END_RECORD.pack(b"PK\005\006", 0, 0, min(len(entries), 0xFFFF), min(len(entries), 0xFFFF),
+                                      min(size_dir, 0xFFFFFFFF), min(start_dir, 0xFFFFFFFF), 0))
+        else:
+            out.write(END_RECORD.pack(b"PK\005\006", 0, 0, len(entries), len(entries),
+                                      size_dir, start_dir, 0))
+
+    return len(entries)
+
+
+class ParallelGzipWriter:
+
+    def __init__(self, fileobj, workers, level=6, block_size=BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.compress = partial(gzip_block, level=level)
+        self.max_pending = workers * 4
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def submit(self, block):
+        self.pending.append(self.executor.submit(self.compress, block))
+        while len(self.pending) >= self.max_pending:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer.clear()
+        for future in self.pending:
+            self.fileobj.write(future.result())
+        self.pending.clear()
+        self.executor.shutdown()
+
+
+def write_parallel_tar(archive, folder, workers, level=6, member_filter=None):
+    with open(archive, 'wb') as out:
+        writer = ParallelGzipWriter(out, workers, level)
+        try:
+            with tarfile.open(fileobj=writer, mode='w|') as tarf:
+                tarf.add(folder, arcname=os.path.basename(folder), filter=member_filter)
+        finally:
+            writer.close()
@@ -0,0 +1,77 @@
+import itertools
+from collections import deque
+from core import utils
+
+DEFAULT_LINES = 10
+
+
+class PipePlugin:
+
+    def __init__(self, shell):
+        self.shell = shell
+
+    def line_options(self, name, args):
+        if args and args[0].startswith("-") and args[0][1:].isdigit():
+            args = ["-n", args[0][1:]] + args[1:]
+        try:
+            positional, options = utils.split_args(args, value_options=("-n",))
+            count = int(options.get("-n", DEFAULT_LINES))
+            if count < 0:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Usage: {name} [-n N | -N] [file]") from None
+        return positional, count
+
+    def source(self, positional, upstream):
+        if positional:
+            file_path = utils.parse_path(self.shell.current_dir, positional[0])
+            if not self.shell.stat_cache.isfile(file_path):
+                raise FileNotFoundError(f"No such file: {file_path}")
+            return self.read_lines(file_path)
+        if upstream is None:
+            raise ValueError("File name or pipeline input required")
+        return upstream
+
+    def read_lines(self, file_path):
+        with open(file_path, 'r', encoding='utf-8', errors='replace', newline="") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+
+    def head(self, args, upstream=None):
+        positional, count = self.line_options("head", args)
+        lines = self.source(positional, upstream)
+        try:
+            yield from itertools.islice(lines, count)
+        finally:
+            if lines is not upstream:
+                lines.close()
+
+    def tail(self, args, upstream=None):
+        positional, count = self.line_options("tail", args)
+        if positional:
+            file_path = utils.parse_path(self.shell.current_dir, positional[0])
+            if not self.shell.stat_cache.isfile(file_path):
+                raise FileNotFoundError(f"No such file: {file_path}")
+            with open(file_path, 'rb') as f:
+                f.seek(utils.tail_offset(f, count))
+                for line in f:
+                    yield line.rstrip(b"\r\n").decode('utf-8', errors='replace')
+            return
+
+        yield from deque(self.source(positional, upstream), maxlen=count)
+
+    def wc(self, args, upstream=None):
+        try:
+            positional, options = utils.split_args(args, flags=("-l", "-w", "-c"))
+        except ValueError:
+            raise ValueError("Usage: wc [-l] [-w] [-c] [file]") from None
+        counted = [flag for flag in ("-l", "-w", "-c") if flag in options] or ["-l", "-w", "-c"]
+        lines = self.source(positional, upstream)
+
+        totals = {"-l": 0, "-w": 0, "-c": 0}
+        for line in lines:
+            totals["-l"] += 1
+            totals["-w"] += len(line.split())
+            totals["-c"] += len(line.encode('utf-8')) + 1
+
+        yield " ".join(f"{totals[flag]:7}" for flag in counted)
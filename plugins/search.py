@@ -1,6 +1,135 @@
 import os
 import re
+import mmap
+import time
+import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from core import utils
+from plugins.search_index import TrigramIndex, index_file_for, required_trigrams
+
+
+REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+UNICODE_SENSITIVE = re.compile(r"\\[wWbBdDsS]|\.|\[\^")
+
+
+def is_literal(pattern):
+    return not REGEX_METACHARS.intersection(pattern)
+
+
+def is_byte_safe(pattern, flags=0):
+    return pattern.isascii() and not flags & re.IGNORECASE and not UNICODE_SENSITIVE.search(pattern)
+
+
+def compile_pattern(pattern, flags=0):
+    if not flags & re.IGNORECASE and is_literal(pattern):
+        return pattern.encode('utf-8')
+    if is_byte_safe(pattern, flags):
+        return re.compile(pattern.encode('utf-8'), flags | re.MULTILINE)
+    return re.compile(pattern, flags)
+
+
+def find_candidate(buf, matcher, pos):
+    if isinstance(matcher, bytes):
+        return buf.find(matcher, pos)
+    match = matcher.search(buf, pos)
+    return match.start() if match else -1
+
+
+def scan_text(buf, matcher):
+    matches = []
+    pos = 0
+    line_num = 1
+    size = len(buf)
+
+    while pos < size:
+        line_end = buf.find(b"\n", pos)
+        if line_end < 0:
+            line_end = size
+        line = buf[pos:line_end].decode('utf-8', errors='ignore')
+        if matcher.search(line):
+            matches.append((line_num, line.strip()))
+        line_num += 1
+        pos = line_end + 1
+
+    return matches
+
+
+def scan_buffer(buf, matcher):
+    if not isinstance(matcher, bytes) and isinstance(matcher.pattern, str):
+        return scan_text(buf, matcher)
+
+    matches = []
+    literal = isinstance(matcher, bytes)
+    pos = 0
+    counted_to = 0
+    line_num = 1
+    size = len(buf)
+
+    while pos < size:
+        found = find_candidate(buf, matcher, pos)
+        if found < 0:
+            break
+
+        line_start = buf.rfind(b"\n", 0, found) + 1
+        line_end = buf.find(b"\n", found)
+        if line_end < 0:
+            line_end = size
+
+        if literal or matcher.search(buf, line_start, line_end):
+            line_num += buf[counted_to:line_start].count(b"\n")
+            counted_to = line_start
+            line = buf[line_start:line_end].decode('utf-8', errors='ignore').strip()
+            matches.append((line_num, line))
+
+        pos = line_end + 1
+
+    return matches
+
+
+def scan_file(file_path, matcher):
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return file_path, []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return file_path, scan_buffer(buf, matcher)
+    except (OSError, ValueError):
+        return file_path, []
+
+
+def scan_batch(batch, matcher):
+    return [scan_file(file_path, matcher) for file_path in batch]
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parallel_search(files, matcher, workers, use_threads=False, batch_size=32, cancel=None):
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    scan = partial(scan_batch, matcher=matcher)
+
+    executor = executor_class(max_workers=workers)
+    try:
+        for _, results in utils.ordered_map(executor, scan, batched(files, batch_size), workers * 4):
+            utils.check_cancelled(cancel)
+            yield from results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def serial_search(files, matcher, cancel=None):
+    for file_path in files:
+        utils.check_cancelled(cancel)
+        yield scan_file(file_path, matcher)
 
 
 class SearchPlugin:
@@ -9,49 +138,147 @@ class SearchPlugin:
         self.shell = shell
 
     def grep(self, args):
-        if len(args) < 2:
-            print("ERROR: Usage: grep <pattern> <path> [-r] [-i]")
-            utils.log_command(self.shell.log_file, "grep", False, "Incorrect number of arguments")
+        try:
+            utils.write_lines(self.grep_lines(args))
+            utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", False, error_msg)
+
+    def grep_lines(self, args, upstream=None):
+        usage = "Usage: grep <pattern> <path> [-r] [-i] [-j N] [--threads] [--no-index]"
+
+        try:
+            positional, options = utils.split_args(args, value_options=("-j",),
+                                                  flags=("-r", "-i", "--threads", "--no-index"))
+            workers = int(options.get("-j", 1))
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError(usage) from None
+
+        flags = re.IGNORECASE if "-i" in options else 0
+
+        if len(positional) == 1 and upstream is not None:
+            pattern = positional[0]
+            if not flags and is_literal(pattern):
+                yield from (line for line in upstream if pattern in line)
+            else:
+                matcher = re.compile(pattern, flags)
+                yield from (line for line in upstream if matcher.search(line))
             return
 
-        pattern = args[0]
-        path = utils.parse_path(self.shell.current_dir, args[1])
-        recursive = "-r" in args
-        case_insensitive = "-i" in args
+        if len(positional) < 2:
+            raise ValueError(usage)
+
+        pattern = positional[0]
+        path = utils.parse_path(self.shell.current_dir, positional[1])
+        recursive = "-r" in options
+        use_threads = "--threads" in options
+
+        if not self.shell.stat_cache.exists(path):
+            raise FileNotFoundError(f"No such file or directory: {path}")
 
-        flags = re.IGNORECASE if case_insensitive else 0
+        matcher = compile_pattern(pattern, flags)
+
+        if self.shell.stat_cache.isfile(path):
+            results = serial_search([path], matcher)
+        elif self.shell.stat_cache.isdir(path) and recursive:
+            files = None
+            if "--no-index" not in options:
+                files = self.indexed_candidates(path, pattern)
+            if files is None:
+                files = utils.walk_files(path)
+            cancel = self.shell.cancellation()
+            if workers > 1:
+                results = parallel_search(files, matcher, workers, use_threads, cancel=cancel)
+            else:
+                results = serial_search(files, matcher, cancel)
+        else:
+            raise ValueError("Use -r for recursive search in directories")
+
+        try:
+            for file_path, matches in results:
+                for line_num, line in matches:
+                    yield f"{file_path}:{line_num}: {line}"
+        finally:
+            results.close()
+
+    def find_index(self, path):
+        current = os.path.abspath(path)
+        while True:
+            index_file = index_file_for(self.shell.index_dir, current)
+            if self.shell.stat_cache.exists(index_file):
+                return index_file
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def indexed_candidates(self, path, pattern):
+        trigrams = required_trigrams(pattern)
+        index_file = self.find_index(path) if trigrams is not None else None
+        if not index_file:
+            return None
 
         try:
-            if not os.path.exists(path):
-                error_msg = f"No such file or directory: {path}"
+            index = TrigramIndex.load(index_file, exclude=(self.shell.index_dir,))
+        except (OSError, ValueError):
+            return None
+
+        return index.candidates(os.path.abspath(path), trigrams, self.shell.stat_cache)
+
+    def index_cmd(self, args):
+        if len(args) < 1 or args[0] not in ("build", "refresh", "stats"):
+            print("ERROR: Usage: index <build|refresh|stats> [path]")
+            utils.log_command(self.shell.log_file, f"index {' '.join(args)}", False, "Incorrect arguments")
+            return
+
+        action = args[0]
+        root = utils.parse_path(self.shell.current_dir, args[1]) if len(args) > 1 else self.shell.current_dir
+        root = os.path.abspath(root)
+        index_file = index_file_for(self.shell.index_dir, root)
+
+        try:
+            if not self.shell.stat_cache.isdir(root):
+                error_msg = f"No such directory: {root}"
                 print(f"ERROR: {error_msg}")
-                utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", False, error_msg)
+                utils.log_command(self.shell.log_file, f"index {' '.join(args)}", False, error_msg)
                 return
 
-            def search_in_file(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if re.search(pattern, line, flags):
-                                print(f"{file_path}:{line_num}: {line.strip()}")
-                except:
-                    pass
-
-            if os.path.isfile(path):
-                search_in_file(path)
-            elif os.path.isdir(path) and recursive:
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        search_in_file(file_path)
-            elif os.path.isdir(path):
-                print("ERROR: Use -r for recursive search in directories")
-                utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", False, "Directory without -r flag")
+            if action != "build" and not self.shell.stat_cache.exists(index_file):
+                error_msg = f"No index for {root} (use index build)"
+                print(f"ERROR: {error_msg}")
+                utils.log_command(self.shell.log_file, f"index {' '.join(args)}", False, error_msg)
                 return
 
-            utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", True)
+            os.makedirs(os.path.dirname(index_file), exist_ok=True)
+            if action == "build":
+                index = TrigramIndex(root, exclude=(self.shell.index_dir,))
+            else:
+                index = TrigramIndex.load(index_file, exclude=(self.shell.index_dir,))
+
+            if action == "stats":
+                stats = index.stats()
+                built_at = datetime.datetime.fromtimestamp(stats['built_at']).strftime("%Y-%m-%d %H:%M:%S")
+                print(f"Root: {stats['root']}")
+                print(f"Files: {stats['files']} ({stats['large_files']} not indexed by size)")
+                print(f"Trigrams: {stats['trigrams']}")
+                print(f"Postings: {stats['postings']}")
+                print(f"Index size: {os.path.getsize(index_file)} bytes")
+                print(f"Updated: {built_at}")
+            else:
+                start = time.perf_counter()
+                changed, removed, unchanged = index.refresh()
+                index.save(index_file)
+                elapsed = time.perf_counter() - start
+                print(f"Indexed {root}: {changed} updated, {removed} removed, {unchanged} unchanged ({elapsed:.2f} s)")
+
+            utils.log_command(self.shell.log_file, f"index {' '.join(args)}", True)
 
         except Exception as e:
             error_msg = str(e)
             print(f"ERROR: {error_msg}")
-            utils.log_command(self.shell.log_file, f"grep {' '.join(args)}", False, error_msg)
\ No newline at end of file
+            utils.log_command(self.shell.log_file, f"index {' '.join(args)}", False, error_msg)
@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import hashlib
+from core import utils
+
+INDEX_VERSION = 2
+MAX_INDEXED_SIZE = 8 * 1024 * 1024
+
+
+def index_file_for(index_dir, root):
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(index_dir, f"{digest}.idx")
+
+
+def fold_case(data):
+    if data.isascii():
+        return data.lower()
+    return data.decode('utf-8', errors='surrogateescape').lower().encode('utf-8', errors='surrogateescape')
+
+
+def file_trigrams(file_path):
+    with open(file_path, 'rb') as f:
+        data = fold_case(f.read())
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+ARGUMENT_ESCAPES = re.compile(r"\\[xuUN0-9]")
+
+
+def literal_runs(pattern):
+    if '|' in pattern or re.match(r"\(\?[a-zA-Z]*x", pattern) or ARGUMENT_ESCAPES.search(pattern):
+        return None
+
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+
+    while i < len(pattern):
+        c = pattern[i]
+
+        if c == '\\':
+            escaped = pattern[i + 1:i + 2]
+            i += 2
+            if escaped and not escaped.isalnum() and depth == 0:
+                current += escaped
+                continue
+        elif c == '[':
+            i += 1
+            if pattern[i:i + 1] == '^':
+                i += 1
+            if pattern[i:i + 1] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif c in '*?{':
+            if current and pattern[i - 1] != ')':
+                current = current[:-1]
+            if c == '{':
+                end = pattern.find('}', i)
+                i = end + 1 if end >= 0 else len(pattern)
+            else:
+                i += 1
+        elif c == '(':
+            depth += 1
+            i += 1
+        elif c == ')':
+            depth = max(0, depth - 1)
+            i += 1
+        elif c in '.^$+':
+            i += 1
+        elif depth == 0:
+            current += c
+            i += 1
+            continue
+        else:
+            i += 1
+
+        if len(current) >= 3:
+            runs.append(current)
+        current = ""
+
+    if len(current) >= 3:
+        runs.append(current)
+    return runs
+
+
+def required_trigrams(pattern):
+    runs = literal_runs(pattern)
+    if not runs:
+        return None
+
+    trigrams = set()
+    for run in runs:
+        data = run.lower().encode('utf-8')
+        trigrams.update(data[i:i + 3] for i in range(len(data) - 2))
+    return trigrams
+
+
+class TrigramIndex:
+
+    def __init__(self, root, exclude=()):
+        self.root = os.path.abspath(root)
+        self.exclude = tuple(exclude)
+        self.files = {}
+        self.large = set()
+        self.postings = {}
+        self.dirs = {}
+        self.next_id = 0
+        self.built_at = None
+
+    @classmethod
+    def load(cls, index_file, exclude=()):
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version in {index_file}")
+
+        try:
+            index = cls(data['root'], exclude)
+            index.files = {rel: (int(file_id), int(mtime_ns), int(size))
+                           for rel, (file_id, mtime_ns, size) in data['files'].items()}
+            index.dirs = {rel: int(mtime_ns) for rel, mtime_ns in data['dirs'].items()}
+            index.large = {int(file_id) for file_id in data['large']}
+            index.postings = {bytes.fromhex(trigram): {int(file_id) for file_id in ids}
+                              for trigram, ids in data['postings'].items()}
+            index.next_id = int(data['next_id'])
+            index.built_at = data['built_at']
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Corrupted index {index_file}: {e}") from None
+        return index
+
+    def save(self, index_file):
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        data = {
+            'version': INDEX_VERSION,
+            'root': self.root,
+            'files': self.files,
+            'dirs': self.dirs,
+            'large': sorted(self.large),
+            'postings': {trigram.hex(): sorted(ids) for trigram, ids in self.postings.items()},
+            'next_id': self.next_id,
+            'built_at': self.built_at,
+        }
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_file, index_file)
+
+    def scan_tree(self):
+        tree = []
+        dirs = {}
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                dir_mtime = os.stat(current).st_mtime_ns
+                files, subdirs = utils.scan_dir(current, self.exclude)
+            except OSError:
+                continue
+            dirs[os.path.relpath(current, self.root)] = dir_mtime
+            for entry in files:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                rel = os.path.relpath(entry.path, self.root)
+                tree.append((entry.path, rel, stat.st_mtime_ns, stat.st_size))
+            stack.extend(reversed(subdirs))
+        return tree, dirs
+
+    def refresh(self):
+        tree, self.dirs = self.scan_tree()
+        seen = set()
+        stale_ids = set()
+        changed = []
+
+        for file_path, rel, mtime_ns, size in tree:
+            seen.add(rel)
+            known = self.files.get(rel)
+            if known and known[1] == mtime_ns and known[2] == size:
+                continue
+            if known:
+                stale_ids.add(known[0])
+            changed.append((file_path, rel, mtime_ns, size))
+
+        removed = [rel for rel in self.files if rel not in seen]
+        for rel in removed:
+            stale_ids.add(self.files.pop(rel)[0])
+
+        if stale_ids:
+            self.large -= stale_ids
+            for trigram in list(self.postings):
+                ids = self.postings[trigram]
+                ids -= stale_ids
+                if not ids:
+                    del self.postings[trigram]
+
+        for file_path, rel, mtime_ns, size in changed:
+            file_id = self.next_id
+            self.next_id += 1
+            self.files[rel] = (file_id, mtime_ns, size)
+
+            if size > MAX_INDEXED_SIZE:
+                self.large.add(file_id)
+                continue
+
+            try:
+                trigrams = file_trigrams(file_path)
+            except OSError:
+                self.large.add(file_id)
+                continue
+            for trigram in trigrams:
+                ids = self.postings.get(trigram)
+                if ids is None:
+                    self.postings[trigram] = {file_id}
+                else:
+                    ids.add(file_id)
+
+        self.built_at = time.time()
+        return len(changed), len(removed), len(tree) - len(changed)
+
+    def is_fresh(self, prefix, files, stat_cache):
+        for rel, mtime_ns in self.dirs.items():
+            if prefix == "." or rel == prefix or rel.startswith(prefix + os.sep):
+                st = stat_cache.stat(os.path.join(self.root, rel))
+                if st is None or st.st_mtime_ns != mtime_ns:
+                    return False
+
+        for rel in files:
+            _, mtime_ns, size = self.files[rel]
+            st = stat_cache.stat(os.path.join(self.root, rel))
+            if st is None or st.st_mtime_ns != mtime_ns or st.st_size != size:
+                return False
+        return True
+
+    def candidates(self, path, trigrams, stat_cache):
+        prefix = os.path.relpath(path, self.root)
+        if trigrams is None or prefix not in self.dirs:
+            return None
+
+        files = [rel for rel in self.files if prefix == "." or rel.startswith(prefix + os.sep)]
+        if not self.is_fresh(prefix, files, stat_cache):
+            return None
+
+        postings = sorted((self.postings.get(trigram, set()) for trigram in trigrams), key=len)
+        matched = postings[0].intersection(*postings[1:]) | self.large
+        files.sort(key=lambda rel: [(0, part) for part in rel.split(os.sep)[:-1]] + [(-1, rel)])
+        return [os.path.join(self.root, rel) for rel in files if self.files[rel][0] in matched]
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'files': len(self.files),
+            'large_files': len(self.large),
+            'trigrams': len(self.postings),
+            'postings': sum(len(ids) for ids in self.postings.values()),
+            'built_at': self.built_at,
+        }
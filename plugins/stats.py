@@ -0,0 +1,108 @@
+import io
+import pstats
+import cProfile
+from core import utils
+from core import metrics
+
+PROFILE_LIMIT = 20
+PROFILE_SORT_KEYS = ("tottime", "cumulative", "calls")
+
+
+class StatsPlugin:
+
+    def __init__(self, shell):
+        self.shell = shell
+
+    def stats_cmd(self, args):
+        if args == ["cache"]:
+            self.cache_stats()
+            return
+
+        try:
+            records = self.shell.metrics.load()
+            if args:
+                records = [record for record in records if record['command'] in args]
+            if not records:
+                print("No statistics recorded")
+                utils.log_command(self.shell.log_file, f"stats {' '.join(args)}".strip(), True)
+                return
+
+            lines = [f"{'command':10} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+                     f"{'cpu ms':>8} {'proc read':>10} {'proc write':>10} {'files':>8}"]
+            for row in self.shell.metrics.summary(records):
+                lines.append(f"{row['command']:10} {row['count']:6} {row['p50'] * 1000:9.2f} {row['p95'] * 1000:9.2f} "
+                             f"{row['p99'] * 1000:9.2f} {row['max'] * 1000:9.2f} {row['cpu'] * 1000:8.2f} "
+                             f"{row['read']:10} {row['written']:10} {row['files']:8}")
+
+            if len(args) == 1:
+                counts = self.shell.metrics.histogram(records)
+                widest = max(counts)
+                lines.append("")
+                lower = 0
+                for edge, count in zip(metrics.HISTOGRAM_EDGES + (None,), counts):
+                    label = f"{lower:g}-{edge:g} ms" if edge is not None else f">= {lower:g} ms"
+                    if count:
+                        lines.append(f"{label:>16} {count:6} {'#' * max(1, count * 40 // widest)}")
+                    lower = edge
+
+            print("\n".join(lines))
+            utils.log_command(self.shell.log_file, f"stats {' '.join(args)}".strip(), True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"stats {' '.join(args)}".strip(), False, error_msg)
+
+    def cache_stats(self):
+        counters = self.shell.stat_cache.counters()
+        lookups = counters['hits'] + counters['misses']
+        ratio = counters['hits'] / lookups * 100 if lookups else 0.0
+        invalidation = "inotify" if counters['inotify'] else "mtime"
+        print(f"Stat cache: {counters['hits']} hits, {counters['misses']} misses ({ratio:.1f}% hit rate), "
+              f"{counters['invalidations']} invalidations\n"
+              f"Entries: {counters['entries']}, watched directories: {counters['watches']} ({invalidation})")
+        utils.log_command(self.shell.log_file, "stats cache", True)
+
+    def profile_cmd(self, args):
+        usage = f"ERROR: Usage: profile [--sort {'|'.join(PROFILE_SORT_KEYS)}] [--limit N] <command> [args ...]"
+
+        sort_key = "tottime"
+        limit = PROFILE_LIMIT
+        rest = list(args)
+        try:
+            while rest and rest[0] in ("--sort", "--limit"):
+                option, value = rest[0], rest[1]
+                if option == "--sort":
+                    if value not in PROFILE_SORT_KEYS:
+                        raise ValueError
+                    sort_key = value
+                else:
+                    limit = int(value)
+                rest = rest[2:]
+        except (IndexError, ValueError):
+            rest = []
+
+        if not rest:
+            print(usage)
+            utils.log_command(self.shell.log_file, f"profile {' '.join(args)}".strip(), False, "Incorrect arguments")
+            return
+
+        command_input = " ".join(rest)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                self.shell.execute_command(rest[0].lower(), rest[1:], command_input)
+            finally:
+                profiler.disable()
+
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats(sort_key).print_stats(limit)
+            print(output.getvalue().rstrip())
+            utils.log_command(self.shell.log_file, f"profile {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"profile {' '.join(args)}", False, error_msg)
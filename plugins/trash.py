@@ -0,0 +1,81 @@
+import time
+import datetime
+from core import utils
+
+
+class TrashPlugin:
+
+    def __init__(self, shell):
+        self.shell = shell
+
+    def trash_cmd(self, args):
+        usage = "ERROR: Usage: trash list | trash restore <N|path> [destination] | trash purge [N|path] [--older-than DAYS]"
+
+        try:
+            positional, options = utils.split_args(args, value_options=("--older-than",))
+            older_than = float(options["--older-than"]) * 86400 if "--older-than" in options else None
+        except ValueError:
+            positional = []
+            older_than = None
+
+        if not positional or positional[0] not in ("list", "restore", "purge") or \
+                (positional[0] == "restore" and len(positional) < 2):
+            print(usage)
+            utils.log_command(self.shell.log_file, f"trash {' '.join(args)}".strip(), False, "Incorrect arguments")
+            return
+
+        action = positional[0]
+        try:
+            if action == "list":
+                self.list_items()
+            elif action == "restore":
+                self.restore(positional[1], positional[2] if len(positional) > 2 else None)
+            else:
+                self.purge(positional[1:], older_than)
+
+            utils.log_command(self.shell.log_file, f"trash {' '.join(args)}", True)
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"ERROR: {error_msg}")
+            utils.log_command(self.shell.log_file, f"trash {' '.join(args)}", False, error_msg)
+
+    def list_items(self):
+        lines = []
+        for i, entry in enumerate(self.shell.trash.list(), start=1):
+            deleted = datetime.datetime.fromtimestamp(entry['deleted']).strftime("%Y-%m-%d %H:%M:%S")
+            size = "?" if entry['size'] is None else entry['size']
+            lines.append(f"{i:4}: [{deleted}] {size:>12} {entry['path']}")
+        print("\n".join(lines) if lines else "Trash is empty")
+
+    def find_entry(self, key):
+        entry = self.shell.trash.find(utils.parse_path(self.shell.current_dir, key) if not key.isdigit() else key)
+        if entry is None:
+            raise FileNotFoundError(f"Not in trash: {key}")
+        return entry
+
+    def restore(self, key, destination=None):
+        entry = self.find_entry(key)
+        if destination:
+            destination = utils.parse_path(self.shell.current_dir, destination)
+        restored = self.shell.trash.restore(entry['item'], destination)
+        print(f"Restored {restored}")
+
+    def purge(self, keys, older_than=None):
+        if keys:
+            entries = [self.find_entry(key) for key in keys]
+        else:
+            entries = self.shell.trash.list()
+        if older_than is not None:
+            entries = [entry for entry in entries if time.time() - entry['deleted'] > older_than]
+
+        progress = utils.ProgressReporter("purge", unit="files")
+
+        def report(files, dirs, elapsed):
+            progress.update(files, None, f"{dirs} directories")
+
+        try:
+            purged = self.shell.trash.purge(entries, report=report)
+        finally:
+            progress.finish()
+        print(f"Purged {len(purged)} items")